@@ -0,0 +1,412 @@
+"""
+Performance benchmarks for the Breathing Flower Art Generator.
+Runs headless (SDL dummy video driver) so it can be used on servers and CI boxes.
+
+Usage:
+    cd src
+    python benchmark.py [name ...]
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import math
+import sys
+import tempfile
+import resource
+import time
+from typing import Callable, Dict
+
+import cv2
+import numpy as np
+import pygame
+
+from main import (WIDTH, HEIGHT, COLOR_KEYS, GALLERY_AA_MIN_CELL, MAX_DEFORMATION_CLICKS, RENDER_BACKENDS, DeformationField,
+                  FlowerVisualizer, IrisData, SoftwareRasterizer, copy_surface_bgr, map_features_to_visual)
+
+# Parameters of the most expensive flower the data mapping can produce
+HEAVY_PARAMS = {'base_radius': 140, 'num_petals': 28, 'amplitude': 80, 'num_layers': 12}
+BENCH_COLORS = {
+    'primary': (30, 144, 255),
+    'secondary': (0, 191, 255),
+    'accent': (135, 206, 250),
+    'highlight': (173, 216, 230)
+}
+
+
+def time_call(func: Callable, repeat: int) -> float:
+    """Return the mean wall time of func() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 0):
+    """Write an Iris-schema CSV with `rows` random samples, generated chunk by chunk"""
+    rng = np.random.default_rng(seed)
+    species = np.array(['Iris-setosa', 'Iris-versicolor', 'Iris-virginica'])
+    chunk = 100000
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("Id,SepalLengthCm,SepalWidthCm,PetalLengthCm,PetalWidthCm,Species\n")
+        for start in range(0, rows, chunk):
+            count = min(chunk, rows - start)
+            columns = [np.arange(start + 1, start + count + 1).astype(str),
+                       np.round(rng.uniform(4.3, 7.9, count), 1).astype(str),
+                       np.round(rng.uniform(2.0, 4.4, count), 1).astype(str),
+                       np.round(rng.uniform(1.0, 6.9, count), 1).astype(str),
+                       np.round(rng.uniform(0.1, 2.5, count), 1).astype(str),
+                       species[rng.integers(0, 3, count)]]
+            file.write("\n".join(",".join(row) for row in zip(*columns)) + "\n")
+
+
+def legacy_petal_points(x, y, params, t, mouse_clicks=None, scale_factor=1.0):
+    """Original scalar petal loop, kept as the reference implementation"""
+    base_radius = int(params['base_radius'] * scale_factor)
+    num_petals = params['num_petals']
+    amplitude = int(params['amplitude'] * scale_factor)
+    num_layers = params['num_layers']
+
+    all_points = []
+    for layer in range(num_layers):
+        dynamic_radius = base_radius + layer * 15
+        dynamic_radius += int(amplitude * 0.3 * math.sin(t * 0.08 + layer))
+        dynamic_radius += int(amplitude * 0.2 * math.cos(t * 0.06 + layer * 0.5))
+
+        layer_points = []
+        for petal in range(num_petals):
+            angle = 2 * math.pi * petal / num_petals + t * 0.02 + layer * 0.1
+            points = []
+            for i in range(120):
+                theta = angle + math.pi * i / 120
+                r = dynamic_radius
+                r += int(amplitude * 0.4 * math.sin(6 * theta + t * 0.05 + layer))
+                r -= int(amplitude * 0.2 * math.cos(3 * theta + t * 0.03 + layer))
+                r += int(amplitude * 0.3 * math.sin(9 * theta + t * 0.02))
+                tidal_phase = t * 0.05 + layer * 0.02 + angle
+                r += int(amplitude * 0.5 * math.sin(tidal_phase))
+
+                if mouse_clicks:
+                    for click in mouse_clicks:
+                        point_x = x + r * math.cos(theta + layer * 0.03)
+                        point_y = y + r * math.sin(theta + layer * 0.03)
+                        dist = math.sqrt((point_x - click['x'])**2 + (point_y - click['y'])**2)
+                        if dist < 200:
+                            effect_strength = click['strength'] * (1 - dist / 200)
+                            ripple = math.sin((dist - (t - click['time']) * 5) * 0.15) * effect_strength
+                            r += int(50 * ripple)
+                            spiral_offset = effect_strength * 0.5 * math.sin(theta * 4 + (t - click['time']) * 0.15)
+                            r += int(35 * spiral_offset)
+                            pulse = effect_strength * 0.3 * math.sin((t - click['time']) * 0.2)
+                            r += int(25 * pulse)
+
+                px = x + r * math.cos(theta + layer * 0.03)
+                py = y + r * math.sin(theta + layer * 0.03)
+                points.append((px, py))
+            layer_points.append(points)
+        all_points.append(layer_points)
+    return all_points
+
+
+def bench_geometry(repeat: int = 20) -> Dict[str, float]:
+    """Per-frame cost of petal geometry: scalar reference vs batched NumPy engine"""
+    visualizer = FlowerVisualizer(WIDTH - 300, HEIGHT)
+    cx, cy = visualizer.center_x, visualizer.center_y
+    clicks = [{'x': cx + 60 * i, 'y': cy - 40 * i, 'time': 0, 'strength': 1.0} for i in range(3)]
+    # The batched engine must reproduce the scalar points exactly, with overlapping clicks too
+    small = {'base_radius': 45, 'num_petals': 7, 'amplitude': 23, 'num_layers': 4}
+    overlapping = [{'x': cx + 30 * i - 120, 'y': cy + 20 * (i % 3), 'time': 4 * i, 'strength': 1.0 - 0.08 * i}
+                   for i in range(10)]
+    for params, t, scale_factor, mouse_clicks in ((HEAVY_PARAMS, 0, 1.0, None), (HEAVY_PARAMS, 37, 0.8, None),
+                                                  (small, 251, 1.2, None), (HEAVY_PARAMS, 37, 1.0, clicks),
+                                                  (HEAVY_PARAMS, 60, 1.0, overlapping), (small, 45, 1.2, overlapping)):
+        assert np.array_equal(np.array(legacy_petal_points(cx, cy, params, t, mouse_clicks, scale_factor)),
+                              visualizer.compute_petal_geometry(cx, cy, params, t, mouse_clicks, scale_factor))
+    results = {}
+    for label, mouse_clicks in (("no clicks", None), ("3 clicks", clicks)):
+        legacy_ms = time_call(lambda: legacy_petal_points(cx, cy, HEAVY_PARAMS, 37, mouse_clicks), max(1, repeat // 5))
+        batched_ms = time_call(lambda: visualizer.compute_petal_geometry(cx, cy, HEAVY_PARAMS, 37, mouse_clicks), repeat)
+        print(f"geometry [{label}]: scalar {legacy_ms:.2f} ms, batched {batched_ms:.2f} ms "
+              f"({legacy_ms / batched_ms:.1f}x)")
+        results[label] = legacy_ms / batched_ms
+
+    # Full draw call including pygame line rasterization
+    surface = pygame.Surface((WIDTH - 300, HEIGHT))
+    draw_ms = time_call(lambda: visualizer.draw_data_driven_flower(surface, cx, cy, HEAVY_PARAMS, BENCH_COLORS, 37), repeat)
+    print(f"draw_data_driven_flower: {draw_ms:.2f} ms/frame")
+    return results
+
+
+def bench_raster(repeat: int = 20) -> Dict[str, float]:
+    """Per-frame cost of drawing a flower with each render backend"""
+    visualizer = FlowerVisualizer(WIDTH - 300, HEIGHT)
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    results = {}
+    for backend in RENDER_BACKENDS:
+        visualizer.render_backend = backend
+
+        def draw():
+            surface.fill((0, 0, 0))
+            visualizer.draw_data_driven_flower(surface, visualizer.center_x, visualizer.center_y,
+                                               HEAVY_PARAMS, BENCH_COLORS, 37)
+        results[backend] = time_call(draw, repeat)
+    print("raster: " + ", ".join(f"{backend} {ms:.2f} ms" for backend, ms in results.items()) +
+          f" ({results['pygame'] / results['canvas']:.1f}x)")
+    return results
+
+
+def bench_lod(repeat: int = 20) -> Dict[str, float]:
+    """Draw cost of a small flower (thumbnail-sized output) with and without level of detail"""
+    visualizer = FlowerVisualizer(WIDTH - 300, HEIGHT)
+    surface = pygame.Surface((WIDTH - 300, HEIGHT))
+    small = dict(HEAVY_PARAMS, base_radius=60, amplitude=30, num_layers=6)
+    results = {}
+    for label, quality, pixel_scale in (("full detail", None, 1.0), ("thumbnail LOD", 1.0, 0.22),
+                                        ("thumbnail LOD q=0.5", 0.5, 0.22)):
+        visualizer.lod_quality = quality
+        samples = visualizer.petal_sample_count(small, 0.75, pixel_scale)
+        results[label] = time_call(lambda: visualizer.draw_data_driven_flower(
+            surface, visualizer.center_x, visualizer.center_y, small, BENCH_COLORS, 37, None, 0.75, pixel_scale), repeat)
+        print(f"lod [{label}]: {samples} samples/petal, {results[label]:.2f} ms/frame")
+    return results
+
+
+def bench_gallery(count: int = 150, repeat: int = 10) -> Dict[str, float]:
+    """Draw cost of a full gallery page against drawing its flowers one by one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "iris_gallery.csv")
+        write_synthetic_csv(path, count)
+        iris_data = IrisData(path, use_cache=False)
+    visualizer = FlowerVisualizer(WIDTH - 300, HEIGHT)
+    surface = pygame.Surface((WIDTH - 300, HEIGHT))
+    rect = surface.get_rect()
+    records = iris_data.visual_table[:count]
+    centers, cell = visualizer.gallery_layout(len(records), rect)
+    results = {}
+    for quality in (1.0, 0.5):
+        visualizer.lod_quality = quality
+        label = f"batched q={quality}"
+        results[label] = time_call(lambda: visualizer.draw_gallery(
+            surface, rect, records, centers, cell, BENCH_COLORS, 37), repeat)
+        print(f"gallery [{label}]: {len(records)} flowers, {results[label]:.2f} ms/frame")
+
+    # Baselines: the same flowers (geometry, samples per petal, anti-aliasing) drawn one flower at a time
+    visualizer.lod_quality = 1.0
+    view_scale, samples, layer_step = visualizer.gallery_detail(records, cell)
+    antialias = visualizer.antialias and cell >= GALLERY_AA_MIN_CELL
+    scale = 1 << SoftwareRasterizer.SHIFT
+
+    def flower_batches(i, origin):
+        (_, layers, points), = visualizer.compute_gallery_geometry(records[i:i + 1], centers[i:i + 1], 37, 1.0,
+                                                                   view_scale, samples, origin, layer_step)
+        colors = visualizer.palette.layer_colors(BENCH_COLORS, layers[-1] + 1, 37 + np.arange(layers[-1] + 1) * 10)
+        return [(points[index].reshape(-1, samples, 2), colors[layer].tolist()) for index, layer in enumerate(layers)]
+
+    def draw_each_canvas():
+        for i, center in enumerate(centers):
+            cell_rect = pygame.Rect(0, 0, math.ceil(cell), math.ceil(cell))
+            cell_rect.center = (int(center[0]), int(center[1]))
+            visualizer.rasterizer.draw_batches(surface, flower_batches(i, cell_rect.topleft), cell_rect,
+                                               additive=False, antialias=antialias)
+
+    def draw_each_lines():
+        draw_lines = pygame.draw.aalines if antialias else pygame.draw.lines
+        for i in range(len(records)):
+            for polylines, color in flower_batches(i, (0, 0)):
+                for petal in polylines / scale:
+                    draw_lines(surface, color, False, petal)
+
+    for label, draw_each in (("one by one, canvas", draw_each_canvas), ("one by one, pygame lines", draw_each_lines)):
+        results[label] = time_call(draw_each, max(1, repeat // 2))
+        print(f"gallery [{label}]: {len(records)} flowers, {samples} samples/petal, "
+              f"{'AA' if antialias else 'no AA'}, {results[label]:.2f} ms/frame")
+    return results
+
+
+def bench_deformation(repeat: int = 20) -> Dict[str, float]:
+    """Cost of the click deformation field as the click history grows"""
+    visualizer = FlowerVisualizer(WIDTH - 300, HEIGHT)
+    cx, cy = visualizer.center_x, visualizer.center_y
+    base_ms = time_call(lambda: visualizer.compute_petal_geometry(cx, cy, HEAVY_PARAMS, 37), repeat)
+    print(f"deformation [0 clicks]: {base_ms:.2f} ms/frame")
+    results = {}
+    for count in (10, 100):
+        # Half the clicks land on the flower, half in the empty corners of the canvas
+        clicks = []
+        for i in range(count):
+            angle = 2 * math.pi * i / count
+            radius = 180 if i % 2 == 0 else 600
+            clicks.append({'x': cx + radius * math.cos(angle), 'y': cy + radius * math.sin(angle),
+                           'time': i % 60, 'strength': 1.0 - (i % 60) / 120})
+        field = DeformationField.from_clicks(clicks)
+        field_ms = time_call(lambda: visualizer.compute_petal_geometry(cx, cy, HEAVY_PARAMS, 60, field), repeat)
+        print(f"deformation [{count} clicks]: {field_ms:.2f} ms/frame")
+        results[f"{count} clicks"] = field_ms
+
+        # What the frame governor's click levels evaluate: only the strongest MAX_DEFORMATION_CLICKS
+        strongest = field.strongest(MAX_DEFORMATION_CLICKS)
+        capped_ms = time_call(lambda: visualizer.compute_petal_geometry(cx, cy, HEAVY_PARAMS, 60, strongest), repeat)
+        print(f"deformation [{count} clicks, strongest {len(strongest)}]: {capped_ms:.2f} ms/frame")
+        results[f"{count} clicks capped"] = capped_ms
+    return results
+
+
+def legacy_layer_color(colors, t, layer_ratio):
+    """Original per-layer piecewise color interpolation, kept as the reference implementation"""
+    time_cycle = (t * 0.01) % 1
+    segment = min(int(time_cycle * 4), 3)
+    start = colors[COLOR_KEYS[segment]]
+    end = colors[COLOR_KEYS[(segment + 1) % 4]]
+    ratio = (time_cycle - segment * 0.25) * 4
+    color = [int(start[i] + (end[i] - start[i]) * ratio) for i in range(3)]
+    return tuple([int(c * (1.0 - layer_ratio * 0.3)) for c in color])
+
+
+def bench_palette(repeat: int = 2000) -> Dict[str, float]:
+    """Per-frame cost of the layer colors: piecewise interpolation vs palette LUT gather"""
+    visualizer = FlowerVisualizer(WIDTH - 300, HEIGHT)
+    num_layers = HEAVY_PARAMS['num_layers']
+    colors = visualizer.get_enhanced_color_schemes()['Ocean Blues']
+    times = 37 + np.arange(num_layers) * 10
+    legacy_us = time_call(lambda: [legacy_layer_color(colors, t, layer / (num_layers - 1))
+                                   for layer, t in enumerate(times)], repeat) * 1000
+    lut_us = time_call(lambda: visualizer.palette.layer_colors(colors, num_layers, times).tolist(), repeat) * 1000
+    legacy = np.array([legacy_layer_color(colors, t, layer / (num_layers - 1)) for layer, t in enumerate(times)])
+    error = int(np.abs(legacy - visualizer.palette.layer_colors(colors, num_layers, times)).max())
+    print(f"palette [{num_layers} layers]: interpolation {legacy_us:.1f} us, LUT gather {lut_us:.1f} us "
+          f"({legacy_us / lut_us:.1f}x), max channel difference {error}")
+    return {'legacy_us': legacy_us, 'lut_us': lut_us, 'max_error': error}
+
+
+def bench_visual_table(rows: int = 1000000) -> Dict[str, float]:
+    """Time to precompute the visual parameter table for a large dataset"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "iris_large.csv")
+        write_synthetic_csv(path, rows)
+        iris = IrisData(path)
+        build_ms = time_call(iris.build_visual_table, 1)
+    print(f"visual table [{rows} rows]: {build_ms:.0f} ms to build")
+
+    features = [np.random.default_rng(1).uniform(0, 8, rows) for _ in range(4)]
+    map_ms = time_call(lambda: map_features_to_visual(*features, keys=np.arange(rows)), 3)
+    print(f"visual table [{rows} rows]: {map_ms:.0f} ms for the vectorized mapping alone")
+
+    lookup_us = time_call(lambda: iris.get_visual_params(rows // 2), 10000) * 1000
+    print(f"visual table lookup: {lookup_us:.2f} us")
+    return {'build_ms': build_ms, 'map_ms': map_ms, 'lookup_us': lookup_us}
+
+
+def bench_capture(repeat: int = 30) -> Dict[str, float]:
+    """Per-frame cost of reading the display surface for video recording"""
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    visualizer = FlowerVisualizer(WIDTH - 300, HEIGHT)
+    visualizer.draw_data_driven_flower(screen, visualizer.center_x, visualizer.center_y, HEAVY_PARAMS, BENCH_COLORS, 37)
+
+    def legacy_capture():
+        frame = np.transpose(pygame.surfarray.array3d(screen), (1, 0, 2))
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+
+    out = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    legacy_ms = time_call(legacy_capture, repeat)
+    fused_ms = time_call(lambda: copy_surface_bgr(screen, out), repeat)
+    assert np.array_equal(out, legacy_capture())
+    print(f"capture: array3d+transpose+cvtColor {legacy_ms:.2f} ms, fused buffer copy {fused_ms:.2f} ms "
+          f"({legacy_ms / fused_ms:.1f}x)")
+    return {'legacy_ms': legacy_ms, 'fused_ms': fused_ms}
+
+
+def peak_rss_mib() -> float:
+    """Peak resident set size of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_load(rows: int = 5000000) -> Dict[str, float]:
+    """Load time and peak memory of IrisData on a large CSV, cold and from the binary cache"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "iris_large.csv")
+        write_synthetic_csv(path, rows)
+        baseline = peak_rss_mib()
+        start = time.perf_counter()
+        iris = IrisData(path)
+        load_s = time.perf_counter() - start
+        peak = peak_rss_mib() - baseline
+        start = time.perf_counter()
+        cached = IrisData(path)
+        cached_s = time.perf_counter() - start
+        assert np.array_equal(cached.features, iris.features)
+    resident = iris.ids.nbytes + iris.features.nbytes + iris.species_codes.nbytes + iris.visual_table.nbytes
+    print(f"load [{rows} rows]: {load_s:.2f} s parse + cache write, peak RSS growth {peak:.0f} MiB, "
+          f"resident arrays {resident / 2**20:.0f} MiB ({resident / rows:.0f} bytes/row)")
+    print(f"load [{rows} rows]: {cached_s * 1000:.0f} ms from the binary cache ({load_s / cached_s:.0f}x)")
+    return {'load_s': load_s, 'cached_s': cached_s, 'peak_mib': peak, 'resident_mib': resident / 2**20}
+
+
+def anonymous_rss_mib() -> float:
+    """Current private (anonymous) resident memory of this process, excluding file-backed pages (Linux)"""
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def bench_mmap(rows: int = 5000000, lookups: int = 1000) -> Dict[str, float]:
+    """Memory-mapped mode: streaming cache build, open time and resident memory while navigating"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "iris_large.csv")
+        write_synthetic_csv(path, rows)
+        before = anonymous_rss_mib()
+        start = time.perf_counter()
+        IrisData(path, memory_map=True)
+        build_s = time.perf_counter() - start
+        build_growth = anonymous_rss_mib() - before
+
+        before = anonymous_rss_mib()
+        start = time.perf_counter()
+        iris = IrisData(path, memory_map=True)
+        open_ms = (time.perf_counter() - start) * 1000
+        rng = np.random.default_rng(2)
+        start = time.perf_counter()
+        for index in rng.integers(0, rows, lookups):
+            sample = iris.get_sample_by_index(int(index))
+            dict(sample)
+            iris.get_visual_params(int(index))
+            iris.get_random_sample(sample['species'])
+        lookup_us = (time.perf_counter() - start) * 1e6 / lookups
+        growth = anonymous_rss_mib() - before
+        del iris, sample
+    # File-backed pages of the cache are page cache the kernel can evict, so only anonymous memory is counted
+    print(f"mmap [{rows} rows]: streaming cache build {build_s:.2f} s, anonymous RSS growth {build_growth:.0f} MiB")
+    print(f"mmap [{rows} rows]: open {open_ms:.1f} ms, {lookup_us:.0f} us per navigation step, "
+          f"anonymous RSS growth after {lookups} random rows {growth:.1f} MiB")
+    return {'build_s': build_s, 'build_growth_mib': build_growth, 'open_ms': open_ms, 'rss_growth_mib': growth}
+
+
+BENCHMARKS = {
+    'geometry': bench_geometry,
+    'raster': bench_raster,
+    'lod': bench_lod,
+    'gallery': bench_gallery,
+    'deformation': bench_deformation,
+    'palette': bench_palette,
+    'visual_table': bench_visual_table,
+    'capture': bench_capture,
+    'load': bench_load,
+    'mmap': bench_mmap,
+}
+
+
+def main():
+    """Run the selected benchmarks (all by default)"""
+    pygame.init()
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
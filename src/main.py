@@ -14,14 +14,73 @@ import random
 import cv2
 import numpy as np
 import os
+import argparse
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Mapping, Sequence
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional
 
 # Global settings
 WIDTH, HEIGHT = 1200, 800
 BG_COLOR = (0, 0, 0)  # Pure black background
-FPS = 60
+FPS = 60  # Default render rate (frames per second)
+SIMULATION_RATE = 60  # Fixed simulation steps per second; animation time t counts these steps
+SIMULATION_MAX_STEPS = 10  # Most simulation steps run per rendered frame (beyond that, animation slows down)
 FONT_SIZE = 24
+PETAL_SAMPLES = 120  # Points sampled along each petal curve (upper bound of the level of detail)
+MIN_PETAL_SAMPLES = 16  # Lower bound of the level of detail
+LOD_SEGMENT_LENGTH = 3.0  # Target on-screen petal segment length in pixels at quality 1.0
+LOD_MIN_QUALITY = 0.25  # Lowest quality the frame governor drops to
+GALLERY_PAGE_SIZE = 150  # Flowers shown at once in the gallery view
+GALLERY_AA_MIN_CELL = 100  # Gallery cells smaller than this (pixels) are drawn without anti-aliasing
+GALLERY_POINT_BUDGET = 60000  # Petal points drawn per gallery page, about 12 ms of geometry and rasterization
+GALLERY_MIN_SAMPLES = 5  # Fewest points per petal the gallery point budget may leave
+RENDER_BACKENDS = ('pygame', 'canvas')  # Petal line drawing: pygame.draw.aalines or SoftwareRasterizer
+
+# Input coalescing: clicks arriving in the same frame within CLICK_MERGE_RADIUS of a group's first click are merged
+CLICK_MERGE_RADIUS = 40  # Pixels
+CLICK_MAX_STRENGTH = 3.0  # Deformation strength cap of a merged click (a single click has 1.0)
+MAX_CLICKS_PER_FRAME = 8  # Merged clicks kept per frame (the most tapped ones)
+MAX_DEFORMATION_CLICKS = 8  # Strongest clicks evaluated per frame once the frame governor limits clicks
+RIPPLE_ALPHA_STEP = 4  # Ripple sprites are cached per radius and per alpha rounded down to this step
+
+# Frame governor quality ladder, cheapest visual loss first:
+# (label, level-of-detail factor, anti-aliasing, max layers drawn, max clicks evaluated)
+GOVERNOR_LEVELS = [
+    ("full", 1.0, True, None, None),
+    ("detail 75%", 0.75, True, None, None),
+    ("detail 50%", 0.5, True, None, None),
+    ("clicks 8", 0.5, True, None, MAX_DEFORMATION_CLICKS),
+    ("no AA", 0.5, False, None, MAX_DEFORMATION_CLICKS),
+    ("clicks 4", 0.5, False, None, 4),
+    ("detail 25%", LOD_MIN_QUALITY, False, None, 4),
+    ("layers 8", LOD_MIN_QUALITY, False, 8, 2),
+    ("layers 6", LOD_MIN_QUALITY, False, 6, 1),
+]
+
+# Breathing animation defaults
+SCALE_ANIMATION_SPEED = 0.06  # Slightly slower for smoother breathing (was 0.08)
+SCALE_RANGE = 0.25  # Slightly smaller range for more natural breathing (was 0.3)
+
+# Looping idle animation (frame cache): every petal and breathing term repeats after
+# 2*pi/0.01 ~ 628.3 frames; colors are slowed slightly so the loop holds exactly 6 color cycles
+ANIMATION_LOOP_FRAMES = 628
+ANIMATION_COLOR_SCALE = 600 / ANIMATION_LOOP_FRAMES  # Color time per loop frame
+
+# Video recording formats: (label, output fps, output height or None for the window size)
+RECORDING_PRESETS = [
+    ("30fps native", 30, None),
+    ("30fps 720p", 30, 720),
+    ("30fps 1080p", 30, 1080),
+    ("60fps native", 60, None),
+    ("15fps 480p", 15, 480)
+]
+RENDER_FRAME_NAME = "frame_{:05d}.png"  # PNG sequence frames of the headless renderer (zero-padded to sort in order)
 
 # Color constants
 WHITE = (255, 255, 255)
@@ -33,73 +92,950 @@ WHITE = (255, 255, 255)
 GRAY = (128, 128, 128)
 LIGHT_GRAY = (200, 200, 200)
 
+# Enhanced color schemes: four color stops each, cycled over time
+COLOR_KEYS = ('primary', 'secondary', 'accent', 'highlight')
+COLOR_SCHEMES = {
+    'Ocean Blues': {
+        'primary': (30, 144, 255),    # Dodger blue
+        'secondary': (0, 191, 255),   # Deep sky blue
+        'accent': (135, 206, 250),    # Light sky blue
+        'highlight': (173, 216, 230)  # Light blue
+    },
+    'Sunset Orange': {
+        'primary': (255, 69, 0),      # Red orange
+        'secondary': (255, 140, 0),   # Dark orange
+        'accent': (255, 165, 0),      # Orange
+        'highlight': (255, 218, 185)  # Peach puff
+    },
+    'Forest Green': {
+        'primary': (34, 139, 34),     # Forest green
+        'secondary': (0, 128, 0),     # Green
+        'accent': (144, 238, 144),    # Light green
+        'highlight': (240, 255, 240)  # Honeydew
+    },
+    'Royal Purple': {
+        'primary': (75, 0, 130),      # Indigo
+        'secondary': (138, 43, 226),  # Blue violet
+        'accent': (186, 85, 211),     # Medium orchid
+        'highlight': (238, 130, 238)  # Violet
+    },
+    'Rose Pink': {
+        'primary': (220, 20, 60),     # Crimson
+        'secondary': (255, 20, 147),  # Deep pink
+        'accent': (255, 105, 180),    # Hot pink
+        'highlight': (255, 182, 193)  # Light pink
+    },
+    'Golden Yellow': {
+        'primary': (255, 215, 0),     # Gold
+        'secondary': (255, 165, 0),   # Orange
+        'accent': (255, 255, 0),      # Yellow
+        'highlight': (255, 255, 224)  # Light yellow
+    },
+    'Deep Teal': {
+        'primary': (0, 128, 128),     # Teal
+        'secondary': (0, 206, 209),   # Dark turquoise
+        'accent': (64, 224, 208),     # Turquoise
+        'highlight': (175, 238, 238)  # Pale turquoise
+    },
+    'Cosmic Purple': {
+        'primary': (72, 61, 139),     # Dark slate blue
+        'secondary': (123, 104, 238), # Medium slate blue
+        'accent': (147, 112, 219),    # Medium purple
+        'highlight': (230, 230, 250)  # Lavender
+    }
+}
+PALETTE_LUT_SIZE = 256  # Steps of the precomputed color cycle
+
+# Iris feature columns, in CSV order
+FEATURES = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+FEATURE_ROWS = {feature: row for row, feature in enumerate(FEATURES)}
+SPECIES = ['Iris-setosa', 'Iris-versicolor', 'Iris-virginica']
+SAMPLE_KEYS = ('id', *FEATURES, 'species', 'normalized')
+
+# CSV header of each column
+CSV_COLUMNS = {
+    'id': 'Id',
+    'sepal_length': 'SepalLengthCm',
+    'sepal_width': 'SepalWidthCm',
+    'petal_length': 'PetalLengthCm',
+    'petal_width': 'PetalWidthCm',
+    'species': 'Species'
+}
+
+# Parsed CSV row (columns in this order) and ingestion settings
+CSV_ROW_DTYPE = np.dtype([('id', np.int64)] + [(feature, np.float64) for feature in FEATURES] + [('species', 'U48')])
+CSV_CHUNK_BYTES = 1 << 24  # About 16 MB of text per parsing chunk
+DATASET_CACHE_SUFFIX = ".cache"  # Binary sidecar written next to the CSV
+DATASET_CACHE_MAGIC = b'IRISCOL2'
+DATASET_CACHE_VERSION = 3
+DATASET_CACHE_ALIGN = 4096
+
+# Compact per-sample visual parameter record
+VISUAL_PARAM_DTYPE = np.dtype([
+    ('base_radius', np.int16),
+    ('num_petals', np.int16),
+    ('amplitude', np.int16),
+    ('num_layers', np.int16)
+])
+
+def stable_sample_keys(sepal_length, sepal_width, petal_length, petal_width) -> np.ndarray:
+    """Derive a stable 64-bit key per sample from its features (0.01 cm resolution)"""
+    key = np.zeros(np.shape(sepal_length), dtype=np.uint64)
+    for values in (sepal_length, sepal_width, petal_length, petal_width):
+        quantized = np.round(np.asarray(values) * 100).astype(np.int64) & 0xFFFF
+        key = (key << np.uint64(16)) | quantized.astype(np.uint64)
+    return key
+
+def mix_sample_keys(keys) -> np.ndarray:
+    """SplitMix64 finalizer: a well-spread, process-independent pseudo-random value per key"""
+    z = np.asarray(keys, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def map_features_to_visual(sepal_length, sepal_width, petal_length, petal_width, keys=None) -> np.ndarray:
+    """Vectorized data-to-visual mapping for any number of samples into a VISUAL_PARAM_DTYPE record array"""
+    sepal_length = np.asarray(sepal_length, dtype=np.float64)
+    sepal_width = np.asarray(sepal_width, dtype=np.float64)
+    petal_length = np.asarray(petal_length, dtype=np.float64)
+    petal_width = np.asarray(petal_width, dtype=np.float64)
+    if keys is None:
+        keys = stable_sample_keys(sepal_length, sepal_width, petal_length, petal_width)
+    
+    # Beautiful parameter mapping (restored to original elegant ranges)
+    base_radius = (80 + sepal_length * 8).astype(np.int64)  # Range: 80-140 (elegant size)
+    num_petals = np.clip((16 + petal_length * 2).astype(np.int64), 16, 24)  # Range: 16-24 (balanced)
+    amplitude = (40 + petal_width * 20).astype(np.int64)  # Range: 40-80 (smooth waves)
+    num_layers = np.clip((6 + sepal_width * 2).astype(np.int64), 6, 12)  # Range: 6-12 (layered beauty)
+    
+    # Small random variations for uniqueness (but keeping elegance), one hash per sample
+    with np.errstate(over='ignore'):
+        mixed = mix_sample_keys(keys)
+    radius_variation = (mixed % np.uint64(21)).astype(np.int64) - 10
+    petal_variation = ((mixed >> np.uint64(16)) % np.uint64(5)).astype(np.int64) - 2
+    amplitude_variation = ((mixed >> np.uint64(32)) % np.uint64(11)).astype(np.int64) - 5
+    
+    table = np.empty(base_radius.shape, dtype=VISUAL_PARAM_DTYPE)
+    table['base_radius'] = np.maximum(60, base_radius + radius_variation)
+    table['num_petals'] = np.clip(num_petals + petal_variation, 12, 28)
+    table['amplitude'] = np.maximum(30, amplitude + amplitude_variation)
+    table['num_layers'] = num_layers
+    return table
+
+def breathing_scale_factor(t, speed: float = SCALE_ANIMATION_SPEED, scale_range: float = SCALE_RANGE) -> float:
+    """Smooth breathing scale of the flower at animation time t"""
+    # Calculate smoother auto scaling factor (breathing effect using cosine for smoothness)
+    raw_scale = math.cos(t * speed)
+    # Apply easing function for even smoother transitions
+    eased_scale = raw_scale * raw_scale * raw_scale  # Cubic easing
+    return 1.0 + scale_range * eased_scale
+
+def visual_params_from_record(record) -> Dict[str, int]:
+    """Convert one VISUAL_PARAM_DTYPE record to the params dict used by the renderer"""
+    return {name: int(record[name]) for name in VISUAL_PARAM_DTYPE.names}
+
+class IrisSample(Mapping):
+    """Lightweight read-only view of one row of an IrisData store, used like the old sample dicts"""
+    
+    __slots__ = ('_store', 'index')
+    
+    def __init__(self, store: 'IrisData', index: int):
+        self._store = store
+        self.index = index  # Row number in the store
+    
+    def __getitem__(self, key):
+        store = self._store
+        if key in FEATURE_ROWS:
+            return float(store.features[FEATURE_ROWS[key], self.index])
+        if key == 'id':
+            return int(store.ids[self.index])
+        if key == 'species':
+            return store.species_names[store.species_codes[self.index]]
+        if key == 'normalized':
+            return store.get_normalized_row(self.index)
+        raise KeyError(key)
+    
+    def __iter__(self):
+        return iter(SAMPLE_KEYS)
+    
+    def __len__(self):
+        return len(SAMPLE_KEYS)
+    
+    def __eq__(self, other):
+        if isinstance(other, IrisSample):
+            return self._store is other._store and self.index == other.index
+        return Mapping.__eq__(self, other)
+    
+    def __hash__(self):
+        return hash((id(self._store), self.index))
+    
+    def __repr__(self):
+        return f"IrisSample({dict(self)})"
+
+class IrisRows(Sequence):
+    """Lightweight sequence of row views over an IrisData store, optionally restricted to sorted row indices"""
+    
+    __slots__ = ('_store', 'indices')
+    
+    def __init__(self, store: 'IrisData', indices: Optional[np.ndarray] = None):
+        self._store = store
+        self.indices = indices
+    
+    def __len__(self):
+        return self._store.size if self.indices is None else len(self.indices)
+    
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            indices = np.arange(self._store.size) if self.indices is None else self.indices
+            return IrisRows(self._store, indices[position])
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("row index out of range")
+        row = position if self.indices is None else int(self.indices[position])
+        return IrisSample(self._store, row)
+    
+    def index(self, sample, start=0, stop=None) -> int:
+        """Position of a sample in this sequence (binary search on the row index)"""
+        if isinstance(sample, IrisSample) and sample._store is self._store:
+            if self.indices is None:
+                position = sample.index
+            else:
+                position = int(np.searchsorted(self.indices, sample.index))
+            if position < len(self) and self[position].index == sample.index:
+                return position
+        raise ValueError(f"{sample!r} is not in rows")
+    
+    def __contains__(self, sample):
+        try:
+            self.index(sample)
+            return True
+        except ValueError:
+            return False
+
+def merge_clicks(positions: List[Tuple[int, int]], radius: float = CLICK_MERGE_RADIUS,
+                 max_clicks: int = MAX_CLICKS_PER_FRAME) -> List[Tuple[float, float, int]]:
+    """Merge click positions into (x, y, count) groups within radius of their first click, most clicked groups first"""
+    cells = {}  # Groups [first x, first y, sum x, sum y, count] by grid cell of their first click
+    for x, y in positions:
+        cell_x, cell_y = int(x // radius), int(y // radius)
+        nearest, nearest_distance = None, radius * radius
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for group in cells.get((cell_x + dx, cell_y + dy), ()):
+                    distance = (x - group[0]) ** 2 + (y - group[1]) ** 2
+                    if distance <= nearest_distance:
+                        nearest, nearest_distance = group, distance
+        if nearest is None:
+            nearest = [x, y, 0.0, 0.0, 0]
+            cells.setdefault((cell_x, cell_y), []).append(nearest)
+        nearest[2] += x
+        nearest[3] += y
+        nearest[4] += 1
+    groups = sorted((group for cell in cells.values() for group in cell), key=lambda group: -group[4])[:max_clicks]
+    return [(sum_x / count, sum_y / count, count) for _, _, sum_x, sum_y, count in groups]
+
+def count_csv_rows(csv_file_path: str) -> int:
+    """Count the data lines of a CSV file (excluding the header) without parsing it"""
+    count = 0
+    last = b'\n'
+    with open(csv_file_path, 'rb') as file:
+        while True:
+            block = file.read(CSV_CHUNK_BYTES)
+            if not block:
+                break
+            count += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        count += 1
+    return max(count - 1, 0)
+
+def align_offset(offset: int, alignment: int = DATASET_CACHE_ALIGN) -> int:
+    """Round an offset up to a multiple of alignment"""
+    return -(-offset // alignment) * alignment
+
 class IrisData:
-    """Iris dataset processing class"""
+    """Iris dataset processing class, stored column by column in NumPy arrays"""
+    
+    def __init__(self, csv_file_path: str, use_cache: bool = True, memory_map: bool = False):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.features = np.empty((len(FEATURES), 0), dtype=np.float64)  # One row per feature
+        self.species_codes = np.empty(0, dtype=np.int8)  # Categorical codes into species_names
+        self.species_names = list(SPECIES)
+        self.feature_min = np.zeros(len(FEATURES))
+        self.feature_max = np.ones(len(FEATURES))
+        self.species_rows = np.empty(0, dtype=np.int64)  # Row numbers grouped by species, ascending
+        self.species_positions = np.empty(0, dtype=np.int64)  # Reverse map: row -> position within its species
+        self.species_indices = {}
+        self.visual_table = np.empty(0, dtype=VISUAL_PARAM_DTYPE)
+        self.cache_path = csv_file_path + DATASET_CACHE_SUFFIX
+        self.memory_mapped = False
+        
+        # Memory-mapped mode: columns stay in the cache file and are paged in on access
+        if memory_map:
+            if self.load_cache(csv_file_path, memory_map=True) or (
+                    self.build_mapped_cache(csv_file_path) and self.load_cache(csv_file_path, memory_map=True)):
+                return
+            print("Falling back to loading the dataset into memory")
+        
+        # Reuse the binary sidecar cache when it matches the CSV, otherwise parse and write it
+        if not (use_cache and self.load_cache(csv_file_path)):
+            self.load_data(csv_file_path)
+            self.build_species_indices()
+            self.build_visual_table()
+            if use_cache:
+                self.save_cache(csv_file_path)
+    
+    @property
+    def size(self) -> int:
+        """Number of samples"""
+        return len(self.ids)
+    
+    @property
+    def data(self) -> IrisRows:
+        """All samples as row views"""
+        return IrisRows(self)
     
-    def __init__(self, csv_file_path: str):
-        self.data = []
-        self.species_data = {'Iris-setosa': [], 'Iris-versicolor': [], 'Iris-virginica': []}
-        self.load_data(csv_file_path)
-        self.normalize_data()
+    @property
+    def species_data(self) -> Dict[str, IrisRows]:
+        """Samples of each species as row views"""
+        return {species: self.get_species_samples(species) for species in self.species_names}
     
-    def load_data(self, csv_file_path: str):
-        """Load CSV data"""
+    def load_data(self, csv_file_path: str, columns: Optional[Dict[str, np.ndarray]] = None):
+        """Load CSV data into typed columns (or the given preallocated ones), parsing it in chunks with NumPy's vectorized reader"""
         try:
-            with open(csv_file_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    iris_sample = {
-                        'id': int(row['Id']),
-                        'sepal_length': float(row['SepalLengthCm']),
-                        'sepal_width': float(row['SepalWidthCm']),
-                        'petal_length': float(row['PetalLengthCm']),
-                        'petal_width': float(row['PetalWidthCm']),
-                        'species': row['Species']
+            capacity = count_csv_rows(csv_file_path)
+            with open(csv_file_path, 'r', encoding='utf-8', newline='') as file:
+                header = [name.strip() for name in next(csv.reader([file.readline()]))]
+                usecols = [header.index(CSV_COLUMNS[name]) for name in CSV_ROW_DTYPE.names]
+                
+                if columns is None:
+                    columns = {
+                        'ids': np.empty(capacity, dtype=np.int64),
+                        'features': np.empty((len(FEATURES), capacity), dtype=np.float64),
+                        'species_codes': np.empty(capacity, dtype=np.int8)
                     }
-                    self.data.append(iris_sample)
-                    self.species_data[iris_sample['species']].append(iris_sample)
+                self.ids = columns['ids']
+                self.features = columns['features']
+                self.species_codes = columns['species_codes']
+                feature_min = np.full(len(FEATURES), np.inf)
+                feature_max = np.full(len(FEATURES), -np.inf)
+                rows = 0
+                while True:
+                    lines = file.readlines(CSV_CHUNK_BYTES)
+                    if not lines:
+                        break
+                    chunk = np.loadtxt(lines, delimiter=',', quotechar='"', usecols=usecols,
+                                       dtype=CSV_ROW_DTYPE, ndmin=1)
+                    end = rows + len(chunk)
+                    self.ids[rows:end] = chunk['id']
+                    for row, feature in enumerate(FEATURES):
+                        values = chunk[feature]
+                        self.features[row, rows:end] = values
+                        if len(values):
+                            feature_min[row] = min(feature_min[row], values.min())
+                            feature_max[row] = max(feature_max[row], values.max())
+                    self.species_codes[rows:end] = self.encode_species(chunk['species'])
+                    rows = end
         except FileNotFoundError:
             print(f"Data file {csv_file_path} not found")
             sys.exit(1)
+        
+        if rows:
+            self.feature_min = feature_min
+            self.feature_max = feature_max
+        # Blank lines were counted but not parsed
+        if rows < capacity:
+            self.ids = self.ids[:rows]
+            self.features = self.features[:, :rows]
+            self.species_codes = self.species_codes[:rows]
+        return rows
     
-    def normalize_data(self):
-        """Normalize data to 0-1 range"""
-        if not self.data:
+    def encode_species(self, names: np.ndarray) -> np.ndarray:
+        """Map species names to categorical codes, registering new species as they appear"""
+        codes = np.full(len(names), -1, dtype=np.int8)
+        for code, species in enumerate(self.species_names):
+            codes[names == species] = code
+        unknown = codes < 0
+        if unknown.any():
+            for species in np.unique(names[unknown]):
+                codes[names == species] = len(self.species_names)
+                self.species_names.append(str(species))
+        return codes
+    
+    def cache_layout(self, rows: int) -> Dict[str, Tuple[np.dtype, Tuple[int, ...]]]:
+        """dtype and shape of each column block stored in the binary cache"""
+        return {
+            'ids': (np.dtype(np.int64), (rows,)),
+            'features': (np.dtype(np.float64), (len(FEATURES), rows)),
+            'species_codes': (np.dtype(np.int8), (rows,)),
+            'species_rows': (np.dtype(np.int64), (rows,)),
+            'species_positions': (np.dtype(np.int64), (rows,)),
+            'visual_table': (VISUAL_PARAM_DTYPE, (rows,))
+        }
+    
+    def create_cache_file(self, path: str, rows: int) -> Tuple[Dict[str, np.memmap], Dict[str, Dict]]:
+        """Create a cache file sized for rows samples and map its column blocks for writing"""
+        layout = {}
+        offset = DATASET_CACHE_ALIGN
+        for name, (dtype, shape) in self.cache_layout(rows).items():
+            layout[name] = {'dtype': np.lib.format.dtype_to_descr(dtype), 'shape': list(shape), 'offset': offset}
+            offset = align_offset(offset + dtype.itemsize * int(np.prod(shape)))
+        with open(path, 'wb') as file:
+            file.write(DATASET_CACHE_MAGIC)
+            file.truncate(offset)
+        columns = {name: np.memmap(path, dtype=self.cache_layout(rows)[name][0], mode='r+',
+                                   offset=column['offset'], shape=tuple(column['shape']))
+                   for name, column in layout.items()}
+        return columns, layout
+    
+    def finish_cache_file(self, path: str, csv_file_path: str, layout: Dict[str, Dict]):
+        """Append the JSON header (source key, statistics, column layout) and move the cache into place"""
+        stat = os.stat(csv_file_path)
+        header = json.dumps({
+            'version': DATASET_CACHE_VERSION,
+            'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns,
+            'rows': self.size,
+            'species_names': self.species_names,
+            'species_offsets': [0] + np.cumsum([len(self.species_indices[species])
+                                                for species in self.species_names]).tolist(),
+            'feature_min': self.feature_min.tolist(),
+            'feature_max': self.feature_max.tolist(),
+            'columns': layout
+        }).encode('utf-8')
+        with open(path, 'r+b') as file:
+            header_offset = file.seek(0, os.SEEK_END)
+            file.write(header)
+            file.seek(len(DATASET_CACHE_MAGIC))
+            file.write(header_offset.to_bytes(8, 'little') + len(header).to_bytes(8, 'little'))
+        os.replace(path, self.cache_path)
+    
+    def save_cache(self, csv_file_path: str):
+        """Write the in-memory columns to a raw, memory-mappable sidecar keyed by the CSV's size and mtime"""
+        if not self.size:
             return
+        temp_path = self.cache_path + ".tmp"
+        try:
+            columns, layout = self.create_cache_file(temp_path, self.size)
+            for name, block in columns.items():
+                block[...] = getattr(self, name)
+                block.flush()
+            del columns, block
+            self.finish_cache_file(temp_path, csv_file_path, layout)
+        except OSError as e:
+            print(f"Could not write dataset cache {self.cache_path}: {e}")
+    
+    def build_mapped_cache(self, csv_file_path: str) -> bool:
+        """Parse the CSV straight into a new cache file, so no column is ever fully resident"""
+        temp_path = self.cache_path + ".tmp"
+        try:
+            capacity = count_csv_rows(csv_file_path)
+            if not capacity:
+                return False
+            columns, layout = self.create_cache_file(temp_path, capacity)
+            self.load_data(csv_file_path, columns)
+            self.build_species_indices(columns['species_rows'], columns['species_positions'])
+            self.build_visual_table(out=columns['visual_table'])
+            for block in columns.values():
+                block.flush()
+            del columns, block
+            self.finish_cache_file(temp_path, csv_file_path, layout)
+            return True
+        except OSError as e:
+            print(f"Could not write dataset cache {self.cache_path}: {e}")
+            return False
+    
+    def read_cache_header(self, csv_file_path: str) -> Optional[Dict]:
+        """Read the cache header if the cache is valid for the CSV"""
+        try:
+            stat = os.stat(csv_file_path)
+            with open(self.cache_path, 'rb') as file:
+                if file.read(len(DATASET_CACHE_MAGIC)) != DATASET_CACHE_MAGIC:
+                    return None
+                header_offset = int.from_bytes(file.read(8), 'little')
+                header_length = int.from_bytes(file.read(8), 'little')
+                file.seek(header_offset)
+                header = json.loads(file.read(header_length).decode('utf-8'))
+        except (OSError, ValueError):
+            return None
+        if (header.get('version') != DATASET_CACHE_VERSION or header['source_size'] != stat.st_size
+                or header['source_mtime_ns'] != stat.st_mtime_ns):
+            return None
+        return header
+    
+    def load_cache(self, csv_file_path: str, memory_map: bool = False) -> bool:
+        """Load columns from the sidecar cache (memory-mapped with memory_map); returns False if it is missing or stale"""
+        header = self.read_cache_header(csv_file_path)
+        if header is None or (memory_map and not header['rows']):
+            return False
         
-        # Get min and max values for each feature
-        features = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
-        min_max = {}
-        
-        for feature in features:
-            values = [sample[feature] for sample in self.data]
-            min_max[feature] = {'min': min(values), 'max': max(values)}
+        rows = header['rows']
+        columns = {}
+        with open(self.cache_path, 'rb') as file:
+            for name, column in header['columns'].items():
+                dtype = np.lib.format.descr_to_dtype(column['dtype'])
+                shape = tuple(column['shape'])
+                if memory_map:
+                    values = np.memmap(self.cache_path, dtype=dtype, mode='r', offset=column['offset'], shape=shape)
+                else:
+                    file.seek(column['offset'])
+                    values = np.fromfile(file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+                columns[name] = values[..., :rows]
         
-        # Normalize each sample
-        for sample in self.data:
-            sample['normalized'] = {}
-            for feature in features:
-                min_val = min_max[feature]['min']
-                max_val = min_max[feature]['max']
-                normalized_val = (sample[feature] - min_val) / (max_val - min_val)
-                sample['normalized'][feature] = normalized_val
+        self.ids = columns['ids']
+        self.features = columns['features']
+        self.species_codes = columns['species_codes']
+        self.species_rows = columns['species_rows']
+        self.species_positions = columns['species_positions']
+        self.visual_table = columns['visual_table']
+        self.species_names = header['species_names']
+        self.feature_min = np.array(header['feature_min'])
+        self.feature_max = np.array(header['feature_max'])
+        offsets = header['species_offsets']
+        self.species_indices = {species: self.species_rows[offsets[code]:offsets[code + 1]]
+                                for code, species in enumerate(self.species_names)}
+        self.memory_mapped = memory_map
+        return True
     
-    def get_sample_by_index(self, index: int) -> Optional[Dict]:
+    def build_species_indices(self, out_rows: Optional[np.ndarray] = None, out_positions: Optional[np.ndarray] = None,
+                              chunk_size: int = 1 << 22):
+        """Index the rows of each species as ascending runs of species_rows, plus each row's position within its species"""
+        self.species_rows = np.empty(self.size, dtype=np.int64) if out_rows is None else out_rows
+        self.species_positions = np.empty(self.size, dtype=np.int64) if out_positions is None else out_positions
+        self.species_indices = {}
+        position = 0
+        for code, species in enumerate(self.species_names):
+            start = position
+            for chunk_start in range(0, self.size, chunk_size):
+                matches = np.flatnonzero(self.species_codes[chunk_start:chunk_start + chunk_size] == code)
+                end = position + len(matches)
+                self.species_rows[position:end] = matches + chunk_start
+                self.species_positions[matches + chunk_start] = np.arange(position - start, end - start)
+                position = end
+            self.species_indices[species] = self.species_rows[start:position]
+    
+    def normalize_data(self):
+        """Recompute the min-max normalization of every feature in one vectorized pass (only needed after editing the columns)"""
+        if not self.size:
+            return
+        self.feature_min = self.features.min(axis=1)
+        self.feature_max = self.features.max(axis=1)
+    
+    def get_normalized(self, feature: str) -> np.ndarray:
+        """Normalized (0-1) values of one feature column"""
+        row = FEATURE_ROWS[feature]
+        value_range = self.feature_max[row] - self.feature_min[row]
+        return (self.features[row] - self.feature_min[row]) / (value_range or 1.0)
+    
+    def get_normalized_row(self, index: int) -> Dict[str, float]:
+        """Normalized (0-1) feature values of one sample"""
+        value_range = self.feature_max - self.feature_min
+        value_range[value_range == 0] = 1.0
+        values = (self.features[:, index] - self.feature_min) / value_range
+        return {feature: float(value) for feature, value in zip(FEATURES, values)}
+    
+    def build_visual_table(self, chunk_size: int = 1 << 20, out: Optional[np.ndarray] = None):
+        """Precompute the visual parameters of every sample, seeded by its Id"""
+        self.visual_table = np.empty(self.size, dtype=VISUAL_PARAM_DTYPE) if out is None else out
+        for start in range(0, self.size, chunk_size):
+            rows = slice(start, start + chunk_size)
+            self.visual_table[rows] = map_features_to_visual(*self.features[:, rows], keys=self.ids[rows])
+    
+    def get_visual_params(self, index: int) -> Optional[Dict[str, int]]:
+        """Get precomputed visual parameters of a sample by index"""
+        if 0 <= index < len(self.visual_table):
+            return visual_params_from_record(self.visual_table[index])
+        return None
+    
+    def get_sample_by_index(self, index: int) -> Optional[IrisSample]:
         """Get sample by index"""
-        if 0 <= index < len(self.data):
-            return self.data[index]
+        if 0 <= index < self.size:
+            return IrisSample(self, index)
         return None
     
-    def get_species_samples(self, species: str) -> List[Dict]:
+    def get_species_indices(self, species: str) -> np.ndarray:
+        """Row indices of all samples of a specific species"""
+        return self.species_indices.get(species, np.empty(0, dtype=np.int64))
+    
+    def get_species_position(self, index: int, species: str) -> Optional[int]:
+        """Position of a row within the rows of a species, or None if it is another species"""
+        if self.species_names[self.species_codes[index]] != species:
+            return None
+        return int(self.species_positions[index])
+    
+    def step_species_sample(self, index: int, species: str, step: int) -> int:
+        """Row index `step` samples away from a row within one species, wrapping around (another species' row counts as position 0)"""
+        indices = self.get_species_indices(species)
+        if not len(indices):
+            return index
+        position = self.get_species_position(index, species) or 0
+        return int(indices[(position + step) % len(indices)])
+    
+    def get_species_samples(self, species: str) -> IrisRows:
         """Get all samples of a specific species"""
-        return self.species_data.get(species, [])
+        return IrisRows(self, self.get_species_indices(species))
     
-    def get_random_sample(self, species: Optional[str] = None) -> Dict:
+    def get_random_sample(self, species: Optional[str] = None) -> IrisSample:
         """Get random sample"""
         if species:
-            samples = self.species_data.get(species, [])
-            return random.choice(samples) if samples else self.data[0]
-        return random.choice(self.data)
+            indices = self.get_species_indices(species)
+            return IrisSample(self, int(indices[random.randrange(len(indices))])) if len(indices) else self.data[0]
+        return IrisSample(self, random.randrange(self.size))
+
+class DeformationField:
+    """Mouse-click deformation sources, stored as an array of (x, y, time, strength) rows"""
+    
+    EFFECT_RADIUS = 200  # Reach of the shape deformation in pixels
+    COLOR_RADIUS = 300   # Reach of the color shift in pixels
+    SEGMENT = 8          # Petal samples per culling segment
+    
+    def __init__(self, sources):
+        self.sources = np.asarray(sources, dtype=np.float64).reshape(-1, 4)
+    
+    @classmethod
+    def from_clicks(cls, mouse_clicks: Optional[List[Dict]]) -> 'DeformationField':
+        """Build a field from the app's list of click dicts, ignoring fully decayed clicks"""
+        rows = [(c['x'], c['y'], c['time'], c['strength']) for c in (mouse_clicks or []) if c['strength'] > 0]
+        return cls(rows)
+    
+    def __len__(self):
+        return len(self.sources)
+    
+    def strongest(self, count: int) -> 'DeformationField':
+        """Field of the `count` strongest sources (itself if it has no more than that)"""
+        if len(self.sources) <= count:
+            return self
+        keep = np.sort(np.argsort(self.sources[:, 3], kind='stable')[len(self.sources) - count:])
+        return DeformationField(self.sources[keep])
+    
+    def color_offset(self, x, y, t) -> float:
+        """Total color-cycle time shift caused by clicks near the flower center"""
+        if not len(self.sources):
+            return 0.0
+        cx, cy, ctime, strength = self.sources.T
+        near = np.hypot(x - cx, y - cy) < self.COLOR_RADIUS
+        return float(np.sum(strength[near] * 15 * np.sin((t - ctime[near]) * 0.08)))
+    
+    @staticmethod
+    def trunc_sin_term(arg: np.ndarray, factor: np.ndarray, scale: float) -> np.ndarray:
+        """trunc(scale * (sin(arg) * factor)) from float32 sines, redoing values near an integer step in float64"""
+        value = np.sin(arg.astype(np.float32))
+        value *= factor.astype(np.float32)
+        value *= np.float32(scale)
+        # Bound of the float32 error: rounding of the argument, the sine and both products
+        bound = np.float32(scale * factor.max() * (np.abs(arg).max() + 4) * 2.0 ** -21)
+        near = np.rint(value)
+        near -= value
+        near = np.abs(near, out=near) <= bound
+        near &= np.abs(value) >= 1 - bound
+        value = np.trunc(value, out=value).astype(np.float64)
+        if near.any():
+            value[near] = np.trunc(scale * (np.sin(arg[near]) * factor[near]))
+        return value
+    
+    def apply(self, x, y, r, theta, cos_dir, sin_dir, t) -> np.ndarray:
+        """Return petal radii r (layers, petals, samples) deformed click by click, culled per layer and petal segment"""
+        sources = self.sources[self.sources[:, 3] > 1 / 50]  # Weaker clicks truncate to no deformation
+        if not len(sources):
+            return r
+        reach = self.EFFECT_RADIUS
+        num_layers, num_petals, samples = r.shape
+        
+        # Split every petal into fixed-size segments (padding the tail by repeating the last sample)
+        num_segments = -(-samples // self.SEGMENT)
+        pad = ((0, 0), (0, 0), (0, num_segments * self.SEGMENT - samples))
+        
+        def segments(values):
+            return np.pad(np.broadcast_to(values, r.shape), pad, mode='edge').reshape(-1, self.SEGMENT)
+        
+        seg_r = segments(r)
+        static = np.stack([segments(cos_dir), segments(sin_dir), segments(theta * 4)], axis=1)
+        base_r = seg_r.copy()
+        px = x + seg_r * static[:, 0]
+        py = y + seg_r * static[:, 1]
+        lo_x, hi_x = px.min(axis=1), px.max(axis=1)
+        lo_y, hi_y = py.min(axis=1), py.max(axis=1)
+        layer_rows = num_petals * num_segments
+        layer_lo = seg_r.reshape(num_layers, -1).min(axis=1)
+        layer_hi = seg_r.reshape(num_layers, -1).max(axis=1)
+        
+        # Points move along their direction: a segment stays within its bounds grown by its largest |r change|
+        moved = np.zeros(len(seg_r))
+        layer_moved = np.zeros(num_layers)
+        
+        for cx, cy, ctime, strength in sources:
+            click_reach = reach * (1 - 1 / (50 * strength)) + 1  # One pixel of margin for rounding
+            
+            # Layer culling: distance from the click to each layer's annulus
+            center_dist = math.hypot(cx - x, cy - y)
+            hit = np.flatnonzero(np.maximum(layer_lo - center_dist, center_dist - layer_hi) - layer_moved < click_reach)
+            if not len(hit):
+                continue
+            start, stop = hit[0] * layer_rows, (hit[-1] + 1) * layer_rows
+            
+            # Segment culling: distance from the click to each segment's bounding box
+            gap_x = np.maximum(lo_x[start:stop] - cx, cx - hi_x[start:stop])
+            gap_x -= moved[start:stop]
+            np.maximum(gap_x, 0, out=gap_x)
+            gap_y = np.maximum(lo_y[start:stop] - cy, cy - hi_y[start:stop])
+            gap_y -= moved[start:stop]
+            np.maximum(gap_y, 0, out=gap_y)
+            gap_x *= gap_x
+            gap_y *= gap_y
+            gap_x += gap_y
+            rows = np.flatnonzero(gap_x < click_reach * click_reach)
+            if not len(rows):
+                continue
+            rows += start
+            
+            # Ripple, spiral and pulse terms of the click, on the points as deformed by the clicks before it
+            age = t - ctime
+            row_r = np.take(seg_r, rows, axis=0)
+            row_static = np.take(static, rows, axis=0)
+            dx = row_r * row_static[:, 0]
+            dx += x
+            dx -= cx
+            dy = row_r * row_static[:, 1]
+            dy += y
+            dy -= cy
+            dx *= dx
+            dy *= dy
+            dx += dy
+            dist = np.sqrt(dx, out=dx)
+            effect_strength = np.divide(dist, reach, out=dy)
+            np.subtract(1, effect_strength, out=effect_strength)
+            effect_strength *= strength
+            np.maximum(effect_strength, 0, out=effect_strength)  # No effect beyond the reach
+            
+            arg = dist - age * 5
+            arg *= 0.15
+            deform = self.trunc_sin_term(arg, effect_strength, 50)
+            arg = np.add(row_static[:, 2], age * 0.15, out=arg)
+            deform += self.trunc_sin_term(arg, effect_strength * 0.5, 35)
+            effect_strength *= 0.3
+            effect_strength *= math.sin(age * 0.2)
+            effect_strength *= 25
+            deform += np.trunc(effect_strength, out=effect_strength)
+            row_r += deform
+            seg_r[rows] = row_r
+            
+            row_r -= np.take(base_r, rows, axis=0)
+            row_moved = np.abs(row_r, out=row_r)
+            while row_moved.shape[1] > 1:  # Row maximum by folding in halves (reducing short rows is slow)
+                width, half = row_moved.shape[1], (row_moved.shape[1] + 1) // 2
+                row_moved = np.maximum(row_moved[:, :half], row_moved[:, width - half:])
+            moved[rows] = row_moved[:, 0]
+            layer_moved = moved.reshape(num_layers, -1).max(axis=1)
+        return seg_r.reshape(num_layers, num_petals, -1)[:, :, :samples]
+
+class ClickStore:
+    """Recent clicks as a structure of arrays: deformation sources plus the age of their ripple, oldest first"""
+    
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.count = 0
+        self.sources = np.zeros((capacity, 4), dtype=np.float64)  # x, y, time (animation steps), strength
+        self.weight = np.zeros(capacity, dtype=np.float64)  # Strength at the time of the click
+        self.age = np.zeros(capacity, dtype=np.float64)  # Seconds since the click (drives the ripple)
+    
+    def __len__(self):
+        return self.count
+    
+    def add(self, xs, ys, t, weights):
+        """Append clicks at (xs, ys) made at animation time t with the given weights"""
+        xs, ys, weights = np.atleast_1d(xs, ys, weights)
+        new = min(len(xs), self.capacity)
+        self.drop(max(self.count + new - self.capacity, 0))
+        rows = slice(self.count, self.count + new)
+        self.sources[rows, 0] = xs[-new:]
+        self.sources[rows, 1] = ys[-new:]
+        self.sources[rows, 2] = t
+        self.sources[rows, 3] = weights[-new:]
+        self.weight[rows] = weights[-new:]
+        self.age[rows] = 0.0
+        self.count += new
+    
+    def update(self, dt: float, t, deform_steps: float, ripple_duration: float):
+        """Age all clicks by dt seconds, decay their strength at animation time t, drop expired ones"""
+        live = slice(0, self.count)
+        self.age[live] += dt
+        self.sources[live, 3] = self.weight[live] * np.maximum(1.0 - (t - self.sources[live, 2]) / deform_steps, 0)
+        alive = (self.sources[live, 3] > 0) | (self.age[live] < ripple_duration - 1e-9)
+        self.drop(int(np.argmax(alive)) if alive.any() else self.count)
+    
+    def drop(self, count: int):
+        """Remove the `count` oldest clicks, shifting the rest down in one copy per array"""
+        if count <= 0:
+            return
+        remaining = self.count - count
+        for array in (self.sources, self.weight, self.age):
+            array[:remaining] = array[count:self.count]
+        self.count = remaining
+    
+    def clear(self):
+        self.count = 0
+    
+    def field(self) -> DeformationField:
+        """Deformation field of the clicks that still have strength (sharing the store's memory)"""
+        sources = self.sources[:self.count]
+        if self.count and not sources[0, 3] > 0:
+            sources = sources[sources[:, 3] > 0]
+        return DeformationField(sources)
+    
+    def ripples(self, duration: float, speed: float, max_ripples: int) -> Tuple[np.ndarray, ...]:
+        """(x, y, radius, intensity) arrays of the newest max_ripples clicks whose ripple is still visible"""
+        start = max(self.count - max_ripples, 0)
+        age = self.age[start:self.count]
+        visible = age < duration - 1e-9
+        age = age[visible]
+        x = self.sources[start:self.count, 0][visible]
+        y = self.sources[start:self.count, 1][visible]
+        radius = np.rint(age * speed).astype(np.int64)
+        return x.astype(np.int64), y.astype(np.int64), radius, 1.0 - age / duration
+
+class Palette:
+    """Color schemes stored once as an (n_schemes, 4, 3) uint8 array with precomputed, per-layer shaded color-cycle LUTs"""
+    
+    MAX_LAYERS = 12  # Layer counts precomputed for the named schemes
+    
+    def __init__(self, schemes: Dict[str, Dict[str, Tuple[int, int, int]]] = COLOR_SCHEMES, max_entries: int = 32):
+        self.names = list(schemes)
+        self.colors = np.array([[scheme[key] for key in COLOR_KEYS] for scheme in schemes.values()], dtype=np.uint8)
+        self.cycle_luts = self.build_cycle_lut(self.colors)
+        self.max_entries = max_entries
+        self.shaded_luts = {}
+        for stops, cycle in zip(self.colors, self.cycle_luts):
+            for num_layers in range(1, self.MAX_LAYERS + 1):
+                self.shaded_luts[(stops.tobytes(), num_layers)] = self.shade_cycle_lut(cycle, num_layers)
+        self.extra_luts = OrderedDict()
+    
+    @staticmethod
+    def build_cycle_lut(stops: np.ndarray) -> np.ndarray:
+        """Color cycle of (..., 4, 3) stop colors as a (..., PALETTE_LUT_SIZE, 3) uint8 table"""
+        time_cycle = np.arange(PALETTE_LUT_SIZE) / PALETTE_LUT_SIZE
+        segment = (time_cycle * len(COLOR_KEYS)).astype(np.int64)
+        ratio = ((time_cycle - segment * 0.25) * 4)[:, None]
+        start = stops[..., segment, :].astype(np.float64)
+        end = stops[..., (segment + 1) % len(COLOR_KEYS), :].astype(np.float64)
+        return np.trunc(start + (end - start) * ratio).astype(np.uint8)
+    
+    @staticmethod
+    def shade_cycle_lut(cycle: np.ndarray, num_layers: int) -> np.ndarray:
+        """Apply the depth shading of each layer (outer layers darker) to a cycle LUT"""
+        layer_ratio = np.arange(num_layers) / (num_layers - 1) if num_layers > 1 else np.zeros(1)
+        intensity = 1.0 - layer_ratio * 0.3
+        return np.trunc(cycle[None, :, :] * intensity[:, None, None]).astype(np.uint8)
+    
+    def stops_array(self, colors) -> np.ndarray:
+        """(4, 3) uint8 stop colors of a scheme dict or array"""
+        if isinstance(colors, np.ndarray):
+            return colors.astype(np.uint8, copy=False)
+        return np.array([colors[key] for key in COLOR_KEYS], dtype=np.uint8)
+    
+    def shaded_lut(self, colors, num_layers: int) -> np.ndarray:
+        """Shaded (num_layers, PALETTE_LUT_SIZE, 3) LUT of a scheme"""
+        stops = self.stops_array(colors)
+        key = (stops.tobytes(), num_layers)
+        lut = self.shaded_luts.get(key)
+        if lut is not None:
+            return lut
+        lut = self.extra_luts.get(key)
+        if lut is None:
+            lut = self.shade_cycle_lut(self.build_cycle_lut(stops), num_layers)
+            self.extra_luts[key] = lut
+            if len(self.extra_luts) > self.max_entries:
+                self.extra_luts.popitem(last=False)
+        else:
+            self.extra_luts.move_to_end(key)
+        return lut
+    
+    @staticmethod
+    def cycle_index(t) -> np.ndarray:
+        """LUT index of color time t (scalar or array)"""
+        time_cycle = np.mod(np.asarray(t, dtype=np.float64) * 0.01, 1.0)
+        return np.minimum((time_cycle * PALETTE_LUT_SIZE).astype(np.int64), PALETTE_LUT_SIZE - 1)
+    
+    def layer_colors(self, colors, num_layers: int, times) -> np.ndarray:
+        """(num_layers, 3) uint8 colors of every layer, layer i at color time times[i]"""
+        lut = self.shaded_lut(colors, num_layers)
+        return lut[np.arange(num_layers), self.cycle_index(times)]
+
+class SoftwareRasterizer:
+    """Rasterizes petal polylines with one OpenCV polylines call per same-colored batch, optionally additively"""
+    
+    SHIFT = 4  # Fractional bits of the fixed-point coordinates passed to OpenCV
+    
+    def __init__(self):
+        self.canvas = np.zeros((0, 0, 3), dtype=np.uint8)  # (height, width, 3) RGB copy of a surface without a pixel view
+        self.scratch = np.zeros((0, 0, 3), dtype=np.uint8)
+    
+    def draw_polylines(self, surface: pygame.Surface, points: np.ndarray, colors: np.ndarray,
+                       rect: pygame.Rect, antialias: bool = True) -> pygame.Rect:
+        """Draw open polylines (layers, petals, samples, 2) additively in (layers, 3) colors inside rect; returns the drawn rect"""
+        return self.draw_batches(surface, list(zip(points, np.asarray(colors).tolist())), rect, antialias=antialias)
+    
+    def draw_batches(self, surface: pygame.Surface, batches: List[Tuple[np.ndarray, Tuple[int, int, int]]],
+                     rect: pygame.Rect, additive: bool = True, antialias: bool = True) -> pygame.Rect:
+        """Draw (polylines (count, samples, 2), color) batches inside rect, additively or straight onto the canvas; returns the drawn rect"""
+        line_type = cv2.LINE_AA if antialias else cv2.LINE_8
+        scale = 1 << self.SHIFT
+        clipped = rect.clip(surface.get_rect())
+        fixed_offset = np.array([clipped.x - rect.x, clipped.y - rect.y], dtype=np.int32) * scale
+        rect = clipped
+        if not rect.width or not rect.height:
+            return rect
+        target = surface.subsurface(rect)
+        canvas = self.pixel_view(target)
+        if canvas is None:
+            # Other pixel formats: draw into an RGB copy of the rect and write it back
+            if self.canvas.shape[:2] != (rect.height, rect.width):
+                self.canvas = np.empty((rect.height, rect.width, 3), dtype=np.uint8)
+            canvas = self.canvas
+            canvas[...] = pygame.surfarray.pixels3d(target).transpose(1, 0, 2)
+        if additive and self.scratch.shape != canvas.shape:
+            self.scratch = np.empty_like(canvas)
+        
+        # Fixed-point coordinates relative to the canvas, one (samples, 2) array per polyline
+        origin = np.array([rect.x, rect.y], dtype=np.float64)
+        for polylines, color in batches:
+            if not len(polylines):
+                continue
+            if canvas.shape[2] == 4:
+                color = (color[2], color[1], color[0], 0)  # B, G, R, X bytes
+            if polylines.dtype == np.int32:
+                fixed = polylines - fixed_offset if fixed_offset.any() else polylines
+            else:
+                fixed = np.rint((polylines - origin) * scale).astype(np.int32)
+            if not additive:
+                cv2.polylines(canvas, fixed, False, color, 1, line_type, self.SHIFT)
+                continue
+            
+            # Only clear and add the batch's own bounding box
+            flat = fixed.reshape(-1, 2)
+            left, top = np.maximum(flat.min(axis=0) // scale - 2, 0).tolist()
+            right, bottom = (flat.max(axis=0) // scale + 3).tolist()
+            if right <= left or bottom <= top:
+                continue
+            scratch = self.scratch[top:bottom, left:right]
+            scratch.fill(0)
+            cv2.polylines(scratch, fixed - np.array([left * scale, top * scale], dtype=np.int32), False,
+                          color, 1, line_type, self.SHIFT)
+            region = canvas[top:bottom, left:right]
+            cv2.add(region, scratch, dst=region)
+        
+        if canvas is self.canvas:
+            pygame.surfarray.blit_array(target, canvas.transpose(1, 0, 2))
+        return rect
+    
+    @staticmethod
+    def pixel_view(surface: pygame.Surface) -> Optional[np.ndarray]:
+        """Writable (height, width, 4) view of a 32-bit B, G, R, X surface's pixels, or None for other formats"""
+        if (surface.get_bytesize() != 4 or surface.get_shifts()[:3] != (16, 8, 0) or sys.byteorder != 'little'
+                or surface.get_flags() & pygame.SRCALPHA):
+            return None
+        height = surface.get_height()
+        return pygame.surfarray.pixels2d(surface).T.view(np.uint8).reshape(height, -1, 4)
 
 class FlowerVisualizer:
     """Flower visualization class"""
@@ -109,6 +1045,20 @@ class FlowerVisualizer:
         self.height = height
         self.center_x = width // 2
         self.center_y = height // 2
+        self.palette = Palette()
+        self.rasterizer = SoftwareRasterizer()
+        self.render_backend = 'pygame'  # One of RENDER_BACKENDS
+        self.lod_quality = 1.0  # Level-of-detail knob: scales the petal sampling density (None = always PETAL_SAMPLES)
+        self.antialias = True  # Anti-aliased petal lines
+        self.max_layers = None  # Draw at most this many (inner) layers; None = all
+        self.max_clicks = None  # Evaluate at most this many (strongest) clicks; None = all
+        self.stats = {'points': 0, 'draw_calls': 0}  # Work done since the last take_stats()
+    
+    def take_stats(self) -> Dict[str, int]:
+        """Return and reset the counters of generated points and issued draw calls"""
+        stats = self.stats
+        self.stats = {'points': 0, 'draw_calls': 0}
+        return stats
     
     def get_species_color_scheme(self, species: str) -> Dict[str, Tuple[int, int, int]]:
         """Get color scheme based on iris species"""
@@ -135,91 +1085,21 @@ class FlowerVisualizer:
         return color_schemes.get(species, color_schemes['Iris-setosa'])
     
     def get_enhanced_color_schemes(self) -> Dict[str, Dict[str, Tuple[int, int, int]]]:
-        """Get all enhanced color schemes for UI selection"""
-        return {
-            'Ocean Blues': {
-                'primary': (30, 144, 255),    # Dodger blue
-                'secondary': (0, 191, 255),   # Deep sky blue
-                'accent': (135, 206, 250),    # Light sky blue
-                'highlight': (173, 216, 230)  # Light blue
-            },
-            'Sunset Orange': {
-                'primary': (255, 69, 0),      # Red orange
-                'secondary': (255, 140, 0),   # Dark orange
-                'accent': (255, 165, 0),      # Orange
-                'highlight': (255, 218, 185)  # Peach puff
-            },
-            'Forest Green': {
-                'primary': (34, 139, 34),     # Forest green
-                'secondary': (0, 128, 0),     # Green
-                'accent': (144, 238, 144),    # Light green
-                'highlight': (240, 255, 240)  # Honeydew
-            },
-            'Royal Purple': {
-                'primary': (75, 0, 130),      # Indigo
-                'secondary': (138, 43, 226),  # Blue violet
-                'accent': (186, 85, 211),     # Medium orchid
-                'highlight': (238, 130, 238)  # Violet
-            },
-            'Rose Pink': {
-                'primary': (220, 20, 60),     # Crimson
-                'secondary': (255, 20, 147),  # Deep pink
-                'accent': (255, 105, 180),    # Hot pink
-                'highlight': (255, 182, 193)  # Light pink
-            },
-            'Golden Yellow': {
-                'primary': (255, 215, 0),     # Gold
-                'secondary': (255, 165, 0),   # Orange
-                'accent': (255, 255, 0),      # Yellow
-                'highlight': (255, 255, 224)  # Light yellow
-            },
-            'Deep Teal': {
-                'primary': (0, 128, 128),     # Teal
-                'secondary': (0, 206, 209),   # Dark turquoise
-                'accent': (64, 224, 208),     # Turquoise
-                'highlight': (175, 238, 238)  # Pale turquoise
-            },
-            'Cosmic Purple': {
-                'primary': (72, 61, 139),     # Dark slate blue
-                'secondary': (123, 104, 238), # Medium slate blue
-                'accent': (147, 112, 219),    # Medium purple
-                'highlight': (230, 230, 250)  # Lavender
-            }
-        }
+        """Get all enhanced color schemes for UI selection (shared, do not modify)"""
+        return COLOR_SCHEMES
     
     def map_data_to_visual(self, sample):
         """Map iris data to visual parameters with beautiful variation"""
         # Extract features from sample dict
-        if isinstance(sample, dict):
-            sepal_length = sample['sepal_length']
-            sepal_width = sample['sepal_width']
-            petal_length = sample['petal_length']
-            petal_width = sample['petal_width']
+        if isinstance(sample, Mapping):
+            features = [sample[feature] for feature in FEATURES]
+            keys = np.array([sample['id']]) if 'id' in sample else None  # Consistent seed per sample
         else:
-            sepal_length, sepal_width, petal_length, petal_width = sample
-        
-        # Beautiful parameter mapping (restored to original elegant ranges)
-        base_radius = int(80 + sepal_length * 8)  # Range: 80-140 (elegant size)
-        num_petals = max(16, min(24, int(16 + petal_length * 2)))  # Range: 16-24 (balanced)
-        amplitude = int(40 + petal_width * 20)  # Range: 40-80 (smooth waves)
-        num_layers = max(6, min(12, int(6 + sepal_width * 2)))  # Range: 6-12 (layered beauty)
-        
-        # Add random seed for variety while keeping elegant shapes
-        import random
-        sample_seed = hash(str(sample)) % 1000  # Consistent seed per sample
-        random.seed(sample_seed)
+            features = list(sample)
+            keys = None
         
-        # Small random variations for uniqueness (but keeping elegance)
-        radius_variation = random.randint(-10, 10)
-        petal_variation = random.randint(-2, 2)
-        amplitude_variation = random.randint(-5, 5)
-        
-        return {
-            'base_radius': max(60, base_radius + radius_variation),
-            'num_petals': max(12, min(28, num_petals + petal_variation)),
-            'amplitude': max(30, amplitude + amplitude_variation),
-            'num_layers': num_layers
-        }
+        table = map_features_to_visual(*([value] for value in features), keys=keys)
+        return visual_params_from_record(table[0])
     
     def get_sample_color_scheme(self, iris_sample: Dict, custom_scheme: str = None) -> Dict[str, Tuple[int, int, int]]:
         """Get color scheme for a specific sample, with optional custom scheme override"""
@@ -238,32 +1118,13 @@ class FlowerVisualizer:
     
     def get_dynamic_color(self, colors: Dict, t: int, layer_ratio: float) -> Tuple[int, int, int]:
         """Get dynamically changing color within the current color scheme"""
-        # Color blending based on time and layer - restored beautiful color cycling
-        time_cycle = (t * 0.01) % 1
-        
-        # Cycle through different colors over time within the current color scheme
-        if time_cycle < 0.25:
-            # Primary to secondary
-            ratio = time_cycle * 4
-            color = self.gradient_color(colors['primary'], colors['secondary'], ratio)
-        elif time_cycle < 0.5:
-            # Secondary to accent
-            ratio = (time_cycle - 0.25) * 4
-            color = self.gradient_color(colors['secondary'], colors['accent'], ratio)
-        elif time_cycle < 0.75:
-            # Accent to highlight
-            ratio = (time_cycle - 0.5) * 4
-            color = self.gradient_color(colors['accent'], colors['highlight'], ratio)
-        else:
-            # Highlight back to primary
-            ratio = (time_cycle - 0.75) * 4
-            color = self.gradient_color(colors['highlight'], colors['primary'], ratio)
+        # Color cycling over time within the current color scheme, from the palette LUT
+        cycle = self.palette.shaded_lut(colors, 1)[0]
+        color = cycle[int(self.palette.cycle_index(t))]
         
         # Add layer variation for depth
         layer_intensity = 1.0 - layer_ratio * 0.3
-        color = tuple([int(c * layer_intensity) for c in color])
-        
-        return color
+        return tuple([int(c * layer_intensity) for c in color])
     
     def gradient_color(self, start: Tuple[int, int, int], end: Tuple[int, int, int], ratio: float) -> Tuple[int, int, int]:
         """Color gradient interpolation"""
@@ -282,96 +1143,220 @@ class FlowerVisualizer:
                 blended_scheme[key] = scheme1[key]
         return blended_scheme
     
-    def draw_data_driven_flower(self, surface, x, y, params, colors, t, mouse_clicks=None, scale_factor=1.0):
-        """Draw beautiful iris flower with elegant patterns (restored original beauty)"""
+    def petal_sample_count(self, params, scale_factor=1.0, pixel_scale: float = 1.0) -> int:
+        """Samples per petal spaced LOD_SEGMENT_LENGTH / lod_quality apart along the petal's projected arc (level of detail)"""
+        if self.lod_quality is None:
+            return PETAL_SAMPLES
+        amplitude = params['amplitude'] * scale_factor
+        outer_radius = params['base_radius'] * scale_factor + (params['num_layers'] - 1) * 15 + amplitude * 1.9
+        arc_length = math.pi * math.hypot(outer_radius, 2.6 * amplitude) * pixel_scale  # Half a turn; shape RMS slope ~2.6 * amplitude
+        samples = math.ceil(arc_length * self.lod_quality / LOD_SEGMENT_LENGTH)
+        return min(max(samples, MIN_PETAL_SAMPLES), PETAL_SAMPLES)
+    
+    def compute_layer_radii(self, base_radius, amplitude, num_layers: int, t) -> np.ndarray:
+        """Compute the breathing base radius of every layer (integer-valued; (flowers, num_layers) for (flowers, 1) inputs)"""
+        layers = np.arange(num_layers, dtype=np.float64)
+        dynamic_radius = base_radius + layers * 15
+        dynamic_radius += np.trunc(amplitude * 0.3 * np.sin(t * 0.08 + layers))
+        dynamic_radius += np.trunc(amplitude * 0.2 * np.cos(t * 0.06 + layers * 0.5))
+        return dynamic_radius
+    
+    def compute_petal_basis(self, num_petals: int, num_layers: int, t, samples: int = PETAL_SAMPLES) -> Dict[str, np.ndarray]:
+        """Trig terms of the petal curves, broadcasting over (num_layers, num_petals, samples), shared by flowers of one layout"""
+        # Broadcast axes: layers (L, 1, 1), petals (1, P, 1), samples (1, 1, S)
+        layers = np.arange(num_layers, dtype=np.float64)[:, None, None]
+        petals = np.arange(num_petals, dtype=np.float64)[None, :, None]
+        steps = np.arange(samples, dtype=np.float64)[None, None, :]
+        steps *= (PETAL_SAMPLES - 1) / max(samples - 1, 1)  # Exactly 1.0 at full detail
+        
+        angle = 2 * np.pi * petals / num_petals + t * 0.02 + layers * 0.1
+        theta = angle + np.pi * steps / PETAL_SAMPLES
+        direction = theta + layers * 0.03
+        return {
+            'theta': theta,
+            'sin6': np.sin(6 * theta + t * 0.05 + layers),
+            'cos3': np.cos(3 * theta + t * 0.03 + layers),
+            'sin9': np.sin(9 * theta + t * 0.02),
+            'tidal': np.sin(t * 0.05 + layers * 0.02 + angle),  # Constant along a petal
+            'cos_dir': np.cos(direction),
+            'sin_dir': np.sin(direction)
+        }
+    
+    def compute_petal_radii(self, basis: Dict[str, np.ndarray], dynamic_radius, amplitude) -> np.ndarray:
+        """Petal radii from a shared basis; dynamic_radius and amplitude broadcast against (L, P, S)"""
+        # Petal shape terms (each term truncated to int as in the scalar version)
+        r = dynamic_radius + np.trunc(amplitude * 0.4 * basis['sin6'])
+        r -= np.trunc(amplitude * 0.2 * basis['cos3'])
+        r += np.trunc(amplitude * 0.3 * basis['sin9'])
+        
+        # Tidal effect is constant along a petal
+        return r + np.trunc(amplitude * 0.5 * basis['tidal'])
+    
+    def compute_petal_geometry(self, x, y, params, t, mouse_clicks=None, scale_factor=1.0,
+                               samples: int = PETAL_SAMPLES) -> np.ndarray:
+        """Every petal polyline of a frame in one batched pass: float64 points (num_layers, num_petals, samples, 2)"""
         base_radius = int(params['base_radius'] * scale_factor)
-        num_petals = params['num_petals']
         amplitude = int(params['amplitude'] * scale_factor)
         num_layers = params['num_layers']
         
-        # Draw multi-layer petals with original beautiful patterns
-        for layer in range(num_layers):
-            layer_ratio = layer / (num_layers - 1) if num_layers > 1 else 0
-            
-            # Elegant dynamic radius calculation (restored)
-            dynamic_radius = base_radius + layer * 15
-            dynamic_radius += int(amplitude * 0.3 * math.sin(t * 0.08 + layer))
-            dynamic_radius += int(amplitude * 0.2 * math.cos(t * 0.06 + layer * 0.5))
-            
-            # Get current layer color with enhanced mouse interaction effects
-            color_time_offset = t + layer * 10  # Restore layer-based color variation
-            
-            # Add mouse click color effects with enhanced visual feedback
-            if mouse_clicks:
-                for click in mouse_clicks:
-                    # Calculate distance from flower center to click
-                    center_dist = math.sqrt((x - click['x'])**2 + (y - click['y'])**2)
-                    if center_dist < 300:  # Color effect radius
-                        # Add time-based color shift based on click - enhanced effect
-                        click_color_offset = click['strength'] * 15 * math.sin((t - click['time']) * 0.08)
-                        color_time_offset += click_color_offset
-            
-            current_color = self.get_dynamic_color(colors, color_time_offset, layer_ratio)
+        basis = self.compute_petal_basis(params['num_petals'], num_layers, t, samples)
+        dynamic_radius = self.compute_layer_radii(base_radius, amplitude, num_layers, t)[:, None, None]
+        r = self.compute_petal_radii(basis, dynamic_radius, amplitude)
+        cos_dir = basis['cos_dir']
+        sin_dir = basis['sin_dir']
+        
+        # Mouse interaction effects
+        if mouse_clicks:
+            field = mouse_clicks if isinstance(mouse_clicks, DeformationField) else DeformationField.from_clicks(mouse_clicks)
+            r = field.apply(x, y, r, basis['theta'], cos_dir, sin_dir, t)
+        
+        points = np.empty(r.shape + (2,), dtype=np.float64)
+        points[..., 0] = x + r * cos_dir
+        points[..., 1] = y + r * sin_dir
+        return points
+    
+    def compute_gallery_geometry(self, records: np.ndarray, centers: np.ndarray, t, scale_factor=1.0,
+                                 view_scale: float = 1.0, samples: int = PETAL_SAMPLES,
+                                 origin: Tuple[float, float] = (0, 0),
+                                 layer_step: int = 1) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """(flower positions, drawn layers, fixed-point int32 points (layers, flowers, petals, samples, 2)) per petal layout"""
+        scale = float(1 << SoftwareRasterizer.SHIFT)
+        groups = []
+        for num_petals in np.unique(records['num_petals']):
+            petal_members = np.flatnonzero(records['num_petals'] == num_petals)
+            layer_counts = records['num_layers'][petal_members]
+            basis = self.compute_petal_basis(int(num_petals), int(layer_counts.max()), t, samples)
+            shape = (0.4 * basis['sin6'] - 0.2 * basis['cos3'] + 0.3 * basis['sin9'] +
+                     0.5 * basis['tidal']).astype(np.float32)
+            directions = (basis['cos_dir'].astype(np.float32), basis['sin_dir'].astype(np.float32))
             
-            # Draw beautiful petals (restored original elegance)
-            for petal in range(num_petals):
-                angle = 2 * math.pi * petal / num_petals + t * 0.02 + layer * 0.1
+            for num_layers in np.unique(layer_counts).tolist():
+                members = petal_members[layer_counts == num_layers]
+                group = records[members]
+                layers = np.arange(num_layers - 1, -1, -layer_step)[::-1]  # Every layer_step-th, outermost kept
                 
-                points = []
-                for i in range(120):
-                    theta = angle + math.pi * i / 120
-                    
-                    # Beautiful petal shape calculation (restored)
-                    r = dynamic_radius
-                    r += int(amplitude * 0.4 * math.sin(6 * theta + t * 0.05 + layer))
-                    r -= int(amplitude * 0.2 * math.cos(3 * theta + t * 0.03 + layer))
-                    r += int(amplitude * 0.3 * math.sin(9 * theta + t * 0.02))
-                    
-                    # Elegant tidal effect (restored)
-                    tidal_phase = t * 0.05 + layer * 0.02 + angle
-                    tidal_effect = amplitude * 0.5 * math.sin(tidal_phase)
-                    r += int(tidal_effect)
-                    
-                    # Mouse interaction effects
-                    if mouse_clicks:
-                        for click in mouse_clicks:
-                            # Calculate position for this point
-                            point_x = x + r * math.cos(theta + layer * 0.03)
-                            point_y = y + r * math.sin(theta + layer * 0.03)
-                            
-                            # Calculate distance from click
-                            dist = math.sqrt((point_x - click['x'])**2 + (point_y - click['y'])**2)
-                            
-                            # Apply deformation based on distance and click strength
-                            if dist < 200:  # Effect radius
-                                effect_strength = click['strength'] * (1 - dist / 200)
-                                
-                                # Create more dramatic ripple effect with faster animation
-                                ripple_speed = 5  # Faster ripple propagation
-                                ripple = math.sin((dist - (t - click['time']) * ripple_speed) * 0.15) * effect_strength
-                                r += int(50 * ripple)  # Stronger ripple effect
-                                
-                                # Add more pronounced spiral distortion with faster decay
-                                spiral_speed = 0.15  # Faster spiral animation
-                                spiral_offset = effect_strength * 0.5 * math.sin(theta * 4 + (t - click['time']) * spiral_speed)
-                                r += int(35 * spiral_offset)  # Stronger spiral effect
-                                
-                                # Add pulsing effect for more dynamic appearance
-                                pulse = effect_strength * 0.3 * math.sin((t - click['time']) * 0.2)
-                                r += int(25 * pulse)
-                    
-                    px = x + r * math.cos(theta + layer * 0.03)
-                    py = y + r * math.sin(theta + layer * 0.03)
-                    points.append((px, py))
+                # Per-flower layer radii and amplitudes in fixed-point units: (L, F, 1, 1) and (1, F, 1, 1)
+                base_radius = np.trunc(group['base_radius'] * scale_factor)[:, None]
+                amplitude = np.trunc(group['amplitude'] * scale_factor)[:, None]
+                layer_radius = self.compute_layer_radii(base_radius, amplitude, num_layers, t).T[layers] * (view_scale * scale)
+                amplitude = (amplitude[:, 0] * (view_scale * scale)).astype(np.float32)[None, :, None, None]
                 
-                if len(points) > 2:
-                    try:
-                        pygame.draw.aalines(surface, current_color, False, points, 1)
-                    except:
-                        # Fallback to regular lines if antialiasing fails
-                        pygame.draw.lines(surface, current_color, False, points, 1)
+                # Shared by both axes: radius (drawn layers, F, P, S) along each point's direction
+                radius = shape[layers, None] * amplitude
+                radius += layer_radius.astype(np.float32)[:, :, None, None]
+                center = ((centers[members] - origin) * scale).astype(np.float32)
+                points = np.empty(radius.shape + (2,), dtype=np.int32)
+                coordinate = np.empty_like(radius)
+                for axis, direction in enumerate(directions):
+                    np.multiply(radius, direction[layers, None], out=coordinate)
+                    coordinate += center[:, axis][None, :, None, None]
+                    points[..., axis] = np.rint(coordinate, out=coordinate)
+                groups.append((members, layers, points))
+        return groups
+    
+    def gallery_layout(self, count: int, rect: pygame.Rect) -> Tuple[np.ndarray, float]:
+        """Centers (count, 2) and cell size of a grid of count square cells filling rect"""
+        columns = max(1, math.ceil(math.sqrt(count * rect.width / rect.height)))
+        rows = max(1, math.ceil(count / columns))
+        cell = min(rect.width / columns, rect.height / rows)
+        cells = np.arange(count)
+        centers = np.empty((count, 2), dtype=np.float64)
+        centers[:, 0] = rect.x + (rect.width - columns * cell) / 2 + (cells % columns + 0.5) * cell
+        centers[:, 1] = rect.y + (rect.height - rows * cell) / 2 + (cells // columns + 0.5) * cell
+        return centers, cell
+    
+    def gallery_detail(self, records: np.ndarray, cell: float, scale_factor=1.0) -> Tuple[float, int, int]:
+        """View scale fitting the largest flower into a cell, then petal samples and layer step within GALLERY_POINT_BUDGET"""
+        max_scale = 1.0 + SCALE_RANGE
+        extents = ((records['base_radius'] + records['amplitude'] * 1.9) * max_scale +
+                   (records['num_layers'] - 1) * 15)
+        largest = int(np.argmax(extents))
+        view_scale = cell * 0.46 / float(extents[largest])
+        samples = self.petal_sample_count(visual_params_from_record(records[largest]), scale_factor, view_scale)
+        if self.lod_quality is None:
+            return view_scale, samples, 1
+        
+        # Layers 15 px apart land closer than a LOD segment on screen in small cells: draw every layer_step-th
+        layer_step = max(1, math.ceil(LOD_SEGMENT_LENGTH / self.lod_quality / (15 * view_scale)))
+        polylines = int(np.sum(-(-records['num_layers'] // layer_step) * records['num_petals']))
+        samples = max(min(samples, GALLERY_POINT_BUDGET // max(polylines, 1)), GALLERY_MIN_SAMPLES)
+        return view_scale, samples, layer_step
+    
+    def draw_gallery(self, surface, rect: pygame.Rect, records: np.ndarray, centers: np.ndarray, cell: float,
+                     colors, t, scale_factor=1.0) -> pygame.Rect:
+        """Draw many flowers (VISUAL_PARAM_DTYPE records) as small multiples, one rasterizer batch per layer color"""
+        if not len(records):
+            return pygame.Rect(rect.x, rect.y, 0, 0)
+        if self.max_layers is not None:
+            records = records.copy()
+            records['num_layers'] = np.minimum(records['num_layers'], self.max_layers)
+        view_scale, samples, layer_step = self.gallery_detail(records, cell, scale_factor)
+        
+        # One batch per petal layout and layer: all its flowers' polylines share a color
+        layer_colors = {}
+        batches = []
+        for members, layers, points in self.compute_gallery_geometry(records, centers, t, scale_factor, view_scale,
+                                                                     samples, (rect.x, rect.y), layer_step):
+            num_layers = int(layers[-1]) + 1
+            if num_layers not in layer_colors:
+                layer_colors[num_layers] = self.palette.layer_colors(
+                    colors, num_layers, t + np.arange(num_layers) * 10).tolist()
+            batches.extend((points[index].reshape(-1, samples, 2), layer_colors[num_layers][layer])
+                           for index, layer in enumerate(layers.tolist()))
+            self.stats['points'] += points.size // 2
+        self.stats['draw_calls'] += len(batches) + 1
+        return self.rasterizer.draw_batches(surface, batches, rect, additive=False,
+                                            antialias=self.antialias and cell >= GALLERY_AA_MIN_CELL)
+    
+    def draw_data_driven_flower(self, surface, x, y, params, colors, t, mouse_clicks=None, scale_factor=1.0,
+                                pixel_scale: float = 1.0, color_t=None) -> pygame.Rect:
+        """Draw beautiful iris flower with elegant patterns (restored original beauty)"""
+        if self.max_layers is not None and params['num_layers'] > self.max_layers:
+            params = dict(params, num_layers=self.max_layers)  # Drop the outer layers
+        num_layers = params['num_layers']
+        field = mouse_clicks if isinstance(mouse_clicks, DeformationField) else DeformationField.from_clicks(mouse_clicks)
+        if self.max_clicks is not None:
+            field = field.strongest(self.max_clicks)
+        samples = self.petal_sample_count(params, scale_factor, pixel_scale)
+        points = self.compute_petal_geometry(x, y, params, t, field, scale_factor, samples)
+        
+        # Click color effects do not depend on the layer, so evaluate them once per frame
+        click_color_offset = field.color_offset(x, y, t)
+        
+        # Layer colors with enhanced mouse interaction effects, one LUT gather for all layers
+        color_times = (t if color_t is None else color_t) + np.arange(num_layers) * 10 + click_color_offset  # Layer-based color variation
+        layer_colors = self.palette.layer_colors(colors, num_layers, color_times)
+        rect = self.points_bounding_rect(points)
+        self.stats['points'] += points.size // 2
+        if self.render_backend == 'canvas':
+            self.stats['draw_calls'] += num_layers + 1  # One polylines batch per layer, one blit
+            return self.rasterizer.draw_polylines(surface, points, layer_colors, rect, self.antialias)
+        self.stats['draw_calls'] += num_layers * params['num_petals']
+        layer_colors = layer_colors.tolist()
+        draw_lines = pygame.draw.aalines if self.antialias else pygame.draw.lines
+        
+        # Draw multi-layer petals with original beautiful patterns
+        for layer in range(num_layers):
+            current_color = layer_colors[layer]
+            
+            # Each petal is a contiguous (samples, 2) slice of the frame buffer
+            for petal_points in points[layer]:
+                try:
+                    draw_lines(surface, current_color, False, petal_points, 1)
+                except:
+                    # Fallback to regular lines if antialiasing fails
+                    pygame.draw.lines(surface, current_color, False, petal_points, 1)
         
         # Remove the center core drawing - no more center circle!
+        return rect
+    
+    def points_bounding_rect(self, points: np.ndarray) -> pygame.Rect:
+        """Bounding rectangle of a point buffer, padded for anti-aliased line edges"""
+        if not points.size:
+            return pygame.Rect(0, 0, 0, 0)
+        left, top = np.floor(points.reshape(-1, 2).min(axis=0)).astype(int) - 2
+        right, bottom = np.ceil(points.reshape(-1, 2).max(axis=0)).astype(int) + 2
+        return pygame.Rect(int(left), int(top), int(right - left), int(bottom - top))
     
     def draw_center_core(self, screen, colors: Dict, t: int, cx: int, cy: int, radius: int):
         """Draw flower center core"""
@@ -380,10 +1365,453 @@ class FlowerVisualizer:
             center_color = self.get_dynamic_color(colors, t * 2, ratio)
             pygame.draw.circle(screen, center_color, (cx, cy), i)
 
+def copy_surface_bgr(surface: pygame.Surface, out: np.ndarray):
+    """Copy a surface into a preallocated (height, width, 3) BGR uint8 array in one fused step"""
+    width, height = surface.get_size()
+    if (surface.get_bytesize() == 4 and surface.get_shifts()[:3] == (16, 8, 0)
+            and sys.byteorder == 'little'):
+        pixels = np.frombuffer(surface.get_buffer(), dtype=np.uint8)
+        pixels = pixels.reshape(height, surface.get_pitch() // 4, 4)[:, :width]
+        cv2.cvtColor(pixels, cv2.COLOR_BGRA2BGR, dst=out)
+    else:
+        view = pygame.surfarray.pixels3d(surface)
+        np.copyto(out, view.transpose(1, 0, 2)[..., ::-1])
+    # Drop the views here so the surface is unlocked before the next draw
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (text, color)"""
+    
+    def __init__(self, font: pygame.font.Font, max_entries: int = 256):
+        self.font = font
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+    
+    def render(self, text: str, color: Tuple[int, int, int]) -> pygame.Surface:
+        """Get the anti-aliased surface of a text, rendering it only on a cache miss"""
+        key = (text, color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        
+        self.misses += 1
+        surface = self.font.render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+class AnimationCache:
+    """LRU cache of rendered flower frames as RLE color-keyed surfaces, one looping animation (ANIMATION_LOOP_FRAMES) per key"""
+    
+    def __init__(self, max_bytes: int, loop_frames: int = ANIMATION_LOOP_FRAMES):
+        self.max_bytes = max_bytes
+        self.loop_frames = loop_frames
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._loops = OrderedDict()  # key -> [(rect, surface, bytes) or None] * loop_frames
+    
+    def __len__(self):
+        return len(self._loops)
+    
+    @staticmethod
+    def encoded_size(surface: pygame.Surface) -> int:
+        """Bytes of a surface's run-length encoding: its non-background pixels plus a 4-byte count per run and row"""
+        pixels = pygame.surfarray.pixels2d(surface)  # (width, height): runs go along axis 0
+        lit = pixels != surface.map_rgb(BG_COLOR)
+        del pixels
+        runs = np.count_nonzero(lit[0]) + np.count_nonzero(lit[1:] & ~lit[:-1])
+        return int(np.count_nonzero(lit)) * surface.get_bytesize() + 4 * (int(runs) + surface.get_height())
+    
+    def get(self, key, frame: int) -> Optional[Tuple[pygame.Rect, pygame.Surface]]:
+        """Cached (rect, surface) of a loop frame, or None"""
+        frames = self._loops.get(key)
+        entry = frames[frame % self.loop_frames] if frames is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._loops.move_to_end(key)
+        self.hits += 1
+        return entry[:2]
+    
+    def put(self, key, frame: int, surface: pygame.Surface, rect: pygame.Rect) -> bool:
+        """Store the rect region of surface as a loop frame; False if it does not fit the budget"""
+        rect = rect.clip(surface.get_rect())
+        copy = surface.subsurface(rect).copy()
+        size = self.encoded_size(copy)
+        while self.size_bytes + size > self.max_bytes and len(self._loops) > (key in self._loops):
+            evicted_key = next(k for k in self._loops if k != key)
+            self.evict(evicted_key)
+        if self.size_bytes + size > self.max_bytes:
+            return False
+        
+        # SDL encodes on the first blit to a destination: blitting the copy back onto its own
+        # pixels encodes it for the screen now and releases the uncompressed copy
+        copy.set_colorkey(BG_COLOR, pygame.RLEACCEL)
+        surface.blit(copy, rect)
+        frames = self._loops.setdefault(key, [None] * self.loop_frames)
+        self._loops.move_to_end(key)
+        previous = frames[frame % self.loop_frames]
+        if previous is not None:
+            self.size_bytes -= previous[2]
+        frames[frame % self.loop_frames] = (rect, copy, size)
+        self.size_bytes += size
+        return True
+    
+    def evict(self, key):
+        """Drop every cached frame of a key"""
+        for entry in self._loops.pop(key):
+            if entry is not None:
+                self.size_bytes -= entry[2]
+    
+    def clear(self):
+        self._loops.clear()
+        self.size_bytes = 0
+
+class FrameProfiler:
+    """Per-stage frame timings (perf_counter_ns) with rolling percentiles and an optional per-frame log"""
+    
+    COUNTERS = ('points', 'draw_calls', 'quality_level')
+    LOG_FORMATS = ('.csv', '.jsonl')
+    
+    def __init__(self, stages: Sequence, history: int = 600):
+        self.stages = tuple(stages)
+        self.stage_index = {stage: i for i, stage in enumerate(self.stages)}
+        self.columns = self.stages + ('total',)
+        self.times = np.zeros((history, len(self.columns)), dtype=np.int64)  # Nanoseconds per frame
+        self.counters = np.zeros((history, len(self.COUNTERS)), dtype=np.int64)
+        self.frames = 0
+        self._current = np.zeros(len(self.columns), dtype=np.int64)
+        self._frame_start = self._last_mark = time.perf_counter_ns()
+        self._log = None
+        self._log_writer = None
+    
+    def begin_frame(self):
+        self._current[:] = 0
+        self._frame_start = self._last_mark = time.perf_counter_ns()
+    
+    def mark(self, stage: str):
+        """Charge the time since the previous mark (or the frame start) to a stage"""
+        now = time.perf_counter_ns()
+        self._current[self.stage_index[stage]] += now - self._last_mark
+        self._last_mark = now
+    
+    def end_frame(self, counters: Optional[Dict[str, int]] = None):
+        """Close the frame: store it in the ring and the log"""
+        self._current[-1] = self._last_mark - self._frame_start
+        row = self.frames % len(self.times)
+        self.times[row] = self._current
+        self.counters[row] = [(counters or {}).get(name, 0) for name in self.COUNTERS]
+        if self._log is not None:
+            self.write_log_row(row)
+        self.frames += 1
+    
+    def percentiles(self, quantiles=(50, 95, 99)) -> np.ndarray:
+        """(len(quantiles), len(columns)) frame-time percentiles in milliseconds over the kept frames"""
+        count = min(self.frames, len(self.times))
+        if not count:
+            return np.zeros((len(quantiles), len(self.columns)))
+        return np.percentile(self.times[:count], quantiles, axis=0) / 1e6
+    
+    def latest_counters(self) -> Dict[str, int]:
+        if not self.frames:
+            return dict.fromkeys(self.COUNTERS, 0)
+        row = (self.frames - 1) % len(self.times)
+        return dict(zip(self.COUNTERS, self.counters[row].tolist()))
+    
+    def open_log(self, path: str):
+        """Start writing every frame to path; the format (CSV or JSONL) follows the extension"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in self.LOG_FORMATS:
+            raise ValueError(f"Unknown profile log format '{extension}', expected one of {self.LOG_FORMATS}")
+        self.close_log()
+        self._log = open(path, 'w', newline='')
+        if extension == '.csv':
+            self._log_writer = csv.writer(self._log)
+            self._log_writer.writerow(('frame',) + tuple(f"{column}_ms" for column in self.columns) + self.COUNTERS)
+        print(f"Writing frame profile to: {path}")
+    
+    def write_log_row(self, row: int):
+        times_ms = (self.times[row] / 1e6).round(4).tolist()
+        counters = self.counters[row].tolist()
+        if self._log_writer is not None:
+            self._log_writer.writerow([self.frames] + times_ms + counters)
+        else:
+            record = {'frame': self.frames, **{f"{column}_ms": value for column, value in zip(self.columns, times_ms)},
+                      **dict(zip(self.COUNTERS, counters))}
+            self._log.write(json.dumps(record) + "\n")
+    
+    def close_log(self):
+        if self._log is not None:
+            self._log.close()
+        self._log = None
+        self._log_writer = None
+
+class FrameGovernor:
+    """Keeps the frame work time within a budget by stepping along a ladder of quality levels (GOVERNOR_LEVELS)"""
+    
+    def __init__(self, budget_ms: float, levels: List[Tuple] = GOVERNOR_LEVELS, settle_frames: int = 10,
+                 recover_frames: int = 90, headroom: float = 0.7):
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.settle_frames = settle_frames
+        self.recover_frames = recover_frames
+        self.headroom = headroom
+        self.enabled = False
+        self.level = 0
+        self.frame_ms = 0.0  # Smoothed work time per frame
+        self.frames = 0
+        self.last_change = 0
+        self.frames_under_budget = 0
+        self.decisions = deque(maxlen=32)
+    
+    @property
+    def label(self) -> str:
+        return self.levels[self.level][0]
+    
+    def settings(self) -> Dict:
+        """Rendering settings of the current level"""
+        _, detail, antialias, max_layers, max_clicks = self.levels[self.level]
+        return {'detail': detail, 'antialias': antialias, 'max_layers': max_layers, 'max_clicks': max_clicks}
+    
+    def update(self, frame_ms: float) -> bool:
+        """Account one frame's work time; returns True when the level changed"""
+        self.frame_ms = 0.9 * self.frame_ms + 0.1 * frame_ms if self.frame_ms else frame_ms
+        self.frames += 1
+        if not self.enabled or self.frames - self.last_change < self.settle_frames:
+            return False
+        if self.frame_ms > self.budget_ms:
+            self.frames_under_budget = 0
+            if self.level < len(self.levels) - 1:
+                return self.set_level(self.level + 1)
+        elif self.frame_ms < self.budget_ms * self.headroom:
+            self.frames_under_budget += 1
+            if self.level > 0 and self.frames_under_budget >= self.recover_frames:
+                return self.set_level(self.level - 1)
+        else:
+            self.frames_under_budget = 0
+        return False
+    
+    def set_level(self, level: int) -> bool:
+        if level == self.level:
+            return False
+        self.decisions.append((self.frames, self.level, level, round(self.frame_ms, 2)))
+        print(f"Frame governor: {self.label} -> {self.levels[level][0]} "
+              f"({self.frame_ms:.1f} ms smoothed, {self.budget_ms:.1f} ms budget)")
+        self.level = level
+        self.last_change = self.frames
+        self.frames_under_budget = 0
+        return True
+
+class SimulationClock:
+    """Fixed-timestep simulation clock: elapsed real time is consumed in steps of 1/rate seconds, at most max_steps per call"""
+    
+    def __init__(self, rate: float = SIMULATION_RATE, max_steps: int = SIMULATION_MAX_STEPS):
+        self.rate = rate
+        self.dt = 1.0 / rate
+        self.max_steps = max_steps
+        self.steps = 0
+        self.accumulator = 0.0  # Real time not yet simulated, in seconds
+    
+    def advance(self, elapsed: float) -> int:
+        """Add elapsed seconds of real time; returns how many fixed steps to run now"""
+        self.accumulator += min(elapsed, self.max_steps * self.dt)
+        steps = int(self.accumulator * self.rate + 1e-6)
+        self.accumulator = max(self.accumulator - steps * self.dt, 0.0)
+        self.steps += steps
+        return steps
+    
+    @property
+    def alpha(self) -> float:
+        """Fraction of the next step already elapsed, in [0, 1)"""
+        return min(self.accumulator * self.rate, 1.0)
+    
+    @property
+    def time(self) -> float:
+        """Simulated time in seconds, including the partial step"""
+        return (self.steps + self.alpha) * self.dt
+
+class RippleSprites:
+    """LRU cache of pre-rendered click ripple sprites (outer ring plus inner glow) keyed by radius and quantized alpha"""
+    
+    def __init__(self, max_bytes: int = 16 << 20, alpha_step: int = RIPPLE_ALPHA_STEP):
+        self.max_bytes = max_bytes
+        self.alpha_step = alpha_step
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._sprites = OrderedDict()
+    
+    @staticmethod
+    def build(radius: int, alpha: int) -> pygame.Surface:
+        """Draw a ripple of the given radius and alpha on a new per-pixel-alpha surface"""
+        surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        
+        # Draw outer ring
+        if radius > 5:
+            pygame.draw.circle(surface, (*WHITE, alpha // 2), (radius, radius), radius, 3)
+        
+        # Draw inner glow
+        if radius > 2:
+            pygame.draw.circle(surface, (*WHITE, alpha // 4), (radius, radius), radius // 2)
+        return surface
+    
+    def render(self, radius: int, alpha: int) -> pygame.Surface:
+        """Get the sprite of a ripple, drawing it only on a cache miss"""
+        key = (radius, alpha - alpha % self.alpha_step)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        
+        self.misses += 1
+        sprite = self.build(*key)
+        self._sprites[key] = sprite
+        self.size_bytes += 4 * radius * radius * 4
+        while self.size_bytes > self.max_bytes and len(self._sprites) > 1:
+            (old_radius, _), _ = self._sprites.popitem(last=False)
+            self.size_bytes -= 4 * old_radius * old_radius * 4
+        return sprite
+    
+    def prewarm(self, duration: float, speed: float, rate: float = SIMULATION_RATE):
+        """Render the sprites of a whole ripple lifetime (duration seconds, growing speed px/s) sampled at rate"""
+        for step in range(int(round(duration * rate))):
+            age = step / rate
+            self.render(int(round(age * speed)), int(255 * (1.0 - age / duration)))
+        self.hits = self.misses = 0  # The counters only cover sprites requested while drawing
+
+class VideoRecorder:
+    """Streaming video recorder: frames go through a bounded ring of buffers to a background encoder thread"""
+    
+    BACKPRESSURE_POLICIES = ('drop', 'block')
+    
+    def __init__(self, filename: str, frame_size: Tuple[int, int], fps: float = 30,
+                 max_queued_frames: int = 8, backpressure: str = 'drop'):
+        if backpressure not in self.BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{backpressure}', expected one of {self.BACKPRESSURE_POLICIES}")
+        self.filename = filename
+        self.frame_size = frame_size  # (width, height)
+        self.fps = fps
+        self.backpressure = backpressure
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.frames_emitted = 0  # Output frames scheduled so far, including repeats
+        self.capture_ms = 0.0  # Smoothed cost of copying one frame out of the surface
+        self._start_time = None
+        self._owed_frames = 0  # Output frames of dropped captures, repeated on the next capture
+        self._scaled_surface = None
+        
+        # Preallocated BGR frame buffers cycle between the free pool and the encoder queue
+        width, height = frame_size
+        self._free_buffers = queue.Queue()
+        for _ in range(max_queued_frames):
+            self._free_buffers.put(np.empty((height, width, 3), dtype=np.uint8))
+        self._queue = queue.Queue()
+        self._stopping = threading.Event()
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self._writer = cv2.VideoWriter(filename, fourcc, fps, frame_size)
+        self._thread = threading.Thread(target=self._encode_loop, name="VideoRecorder", daemon=False)
+        self._thread.start()
+    
+    @property
+    def duration(self) -> float:
+        """Length of the recorded video so far in seconds"""
+        return self.frames_emitted / self.fps
+    
+    @property
+    def is_finished(self) -> bool:
+        """True once the encoder thread has flushed every frame and closed the file"""
+        return not self._thread.is_alive()
+    
+    def acquire_buffer(self) -> Optional[np.ndarray]:
+        """Take a free frame buffer, or None if the frame has to be dropped"""
+        if self._stopping.is_set():
+            return None
+        if self.backpressure == 'block':
+            return self._free_buffers.get()
+        try:
+            return self._free_buffers.get_nowait()
+        except queue.Empty:
+            self.frames_dropped += 1
+            return None
+    
+    def submit(self, buffer: np.ndarray, repeats: int = 1):
+        """Hand a filled BGR buffer from acquire_buffer to the encoder thread, to be written repeats times"""
+        self._queue.put((buffer, repeats))
+    
+    def frames_due(self, timestamp: float) -> int:
+        """Number of output frames whose presentation time has been reached at timestamp (seconds)"""
+        if self._start_time is None:
+            self._start_time = timestamp
+        target = int((timestamp - self._start_time) * self.fps) + 1
+        return max(0, target - self.frames_emitted)
+    
+    def capture(self, surface: pygame.Surface, timestamp: Optional[float] = None) -> bool:
+        """Capture a surface if an output frame is due at timestamp (every call without one); returns False if nothing was queued"""
+        repeats = 1 if timestamp is None else self.frames_due(timestamp)
+        if repeats == 0:
+            return False
+        self.frames_emitted += repeats
+        buffer = self.acquire_buffer()
+        if buffer is None:
+            self._owed_frames += repeats
+            return False
+        
+        start = time.perf_counter()
+        if surface.get_size() != self.frame_size:
+            # Downscale before queueing so the copy and the encoder only see output-sized frames
+            if self._scaled_surface is None:
+                self._scaled_surface = pygame.Surface(self.frame_size, 0, surface)
+            pygame.transform.smoothscale(surface, self.frame_size, self._scaled_surface)
+            surface = self._scaled_surface
+        copy_surface_bgr(surface, buffer)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.capture_ms = elapsed_ms if self.capture_ms == 0 else self.capture_ms * 0.9 + elapsed_ms * 0.1
+        
+        self.submit(buffer, repeats + self._owed_frames)
+        self._owed_frames = 0
+        return True
+    
+    def stop(self):
+        """Stop accepting frames; the encoder thread drains the queue and closes the file"""
+        self._stopping.set()
+    
+    def wait(self, timeout: Optional[float] = None):
+        """Block until all queued frames are written"""
+        self._thread.join(timeout)
+    
+    def _encode_loop(self):
+        """Encoder thread: write frames until stopped and drained, recycling their buffers"""
+        while True:
+            try:
+                frame, repeats = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            for _ in range(repeats):
+                self._writer.write(frame)
+            self.frames_written += repeats
+            self._free_buffers.put(frame)
+        
+        self._writer.release()
+        if self.frames_written == 0:
+            print("No frames to save")
+            return
+        print(f"Video saved as: {self.filename}")
+        print(f"Recorded {self.frames_written} frames ({self.frames_written/self.fps:.1f} seconds, "
+              f"{self.frames_dropped} dropped)")
+
 class InteractiveFlowerApp:
     """Interactive flower application main class"""
     
-    def __init__(self):
+    def __init__(self, data_path: str = "Iris data.csv", memory_map: bool = False, frame_cache_mb: int = 0,
+                 profile_log: Optional[str] = None, render_fps: int = FPS):
         pygame.init()
         self.width = WIDTH
         self.height = HEIGHT
@@ -391,23 +1819,44 @@ class InteractiveFlowerApp:
         pygame.display.set_caption("Data-Driven Ocean Flowers - Iris Dataset Visualization")
         self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(None, FONT_SIZE)
+        self.text_cache = TextCache(self.font)
         
         # Load data
-        self.iris_data = IrisData("Iris data.csv")
+        self.iris_data = IrisData(data_path, memory_map=memory_map)
         self.visualizer = FlowerVisualizer(WIDTH - 300, HEIGHT)  # Reserve space for UI
         
         # Application state
         self.current_sample_index = 0
         self.current_species_filter = None  # None means show all species
         self.is_playing = True
+        
+        # Timing: a fixed-timestep simulation (SIMULATION_RATE) decoupled from the render rate.
+        # self.t is the animation time in simulation steps (it stops while paused); frames are
+        # drawn at self.render_t, interpolated between steps.
+        self.render_fps = render_fps
+        self.sim_clock = SimulationClock()
+        self.frame_seconds = self.sim_clock.dt  # Real time taken by the previous frame
         self.t = 0
+        self.render_t = 0.0
         self.auto_advance = False
-        self.auto_advance_timer = 0
-        self.auto_advance_delay = 120  # 2 seconds (60 FPS * 2)
+        self.auto_advance_timer = 0.0
+        self.auto_advance_delay = 2.0  # Seconds per sample
+        self.view_mode = 'single'  # 'single' flower or a 'gallery' page of small multiples
         
         # UI state
         self.species_list = ['All', 'Iris-setosa', 'Iris-versicolor', 'Iris-virginica']
         self.selected_species_index = 0
+        self.ui_panel = None  # Composited side panel, redrawn section by section when its state changes
+        self.ui_section_keys = {}
+        
+        # Display updates: only push the regions that changed instead of flipping the whole window
+        self.dirty_rect_mode = True
+        self.previous_dirty_rects = []  # Flower and click-effect areas drawn in the previous frame
+        self.full_redraw = True  # Next frame must clear and present the whole window
+        
+        # Quality: the level-of-detail knob, optionally lowered by the frame governor when frames run over budget
+        self.lod_quality = self.visualizer.lod_quality  # Quality at governor level 0
+        self.governor = FrameGovernor(1000 / render_fps)  # Budget: the work time of one frame at render_fps
         
         # Color scheme selection
         self.color_schemes = list(self.visualizer.get_enhanced_color_schemes().keys())
@@ -417,29 +1866,47 @@ class InteractiveFlowerApp:
         
         # Video recording
         self.is_recording = False
-        self.video_writer = None
-        self.video_frames = []
-        self.recording_duration = 3600  # 60 seconds at 60 FPS (1 minute)
-        self.recording_frame_count = 0
-        
-        # Mouse interaction
-        self.mouse_clicks = []  # Store recent mouse clicks
-        self.click_effects = []  # Store active click effects
-        self.max_click_history = 10  # Maximum number of clicks to remember
-        self.click_effect_duration = 60  # 1 second at 60 FPS (faster visual effect)
-        self.click_deform_duration = 120  # 2 seconds at 60 FPS (faster deformation recovery)
+        self.video_recorder = None
+        self.recording_duration = 60.0  # Seconds of output video before auto-stop (1 minute)
+        self.recording_preset_index = 0  # Output format from RECORDING_PRESETS
+        self.recording_timebase = 'wall'  # Pick output frames by 'wall' clock or 'sim' (animation) time
+        self.recording_queue_size = 8  # Preallocated frame buffers for the encoder thread (~2.9 MB each)
+        self.recording_backpressure = 'drop'  # 'drop' frames or 'block' the UI when the encoder falls behind
+        
+        # Mouse interaction: recent clicks (deformation sources and their ripples) in one bounded array store
+        self.max_click_history = 100  # Maximum number of clicks to remember
+        self.max_click_effects = 32  # Maximum number of ripples drawn at once
+        self.clicks = ClickStore(self.max_click_history)
+        self.ripple_sprites = RippleSprites()
+        pygame.event.set_blocked(pygame.MOUSEMOTION)  # Not used; keeps motion floods out of the event queue
+        self.click_effect_duration = 1.0  # Seconds a click ripple stays visible (faster visual effect)
+        self.click_effect_speed = 120  # Ripple growth in pixels per second
+        self.click_deform_duration = 2.0  # Seconds until a click's deformation fades (faster recovery)
+        self.ripple_sprites.prewarm(self.click_effect_duration, self.click_effect_speed)
         
         # Color transition system triggered by mouse clicks
         self.color_transition_active = False
         self.color_transition_progress = 0.0
-        self.color_transition_speed = 0.015  # Slower for smoother gradient
+        self.color_transition_duration = 1.1  # Seconds for gradual color change
+        self.color_transition_speed = 1.0 / self.color_transition_duration  # Progress per second
         self.current_colors = None
         self.target_colors = None
-        self.color_transition_duration = 180  # 3 seconds at 60 FPS for gradual color change
         
         # Auto scaling animation
-        self.scale_animation_speed = 0.06  # Slightly slower for smoother breathing (was 0.08)
-        self.scale_range = 0.25  # Slightly smaller range for more natural breathing (was 0.3)
+        self.scale_animation_speed = SCALE_ANIMATION_SPEED
+        self.scale_range = SCALE_RANGE
+        
+        # Frame profiler: per-stage timings of run(), optional overlay (P key) and per-frame log
+        self.profiler = FrameProfiler(self.PROFILER_STAGES)
+        self.show_profiler = False
+        self.profiler_font = pygame.font.Font(None, 18)
+        self.profiler_text = TextCache(self.profiler_font)
+        self.profiler_lines = []  # Overlay rows of text cells, refreshed every PROFILER_REFRESH_FRAMES
+        if profile_log:
+            self.profiler.open_log(profile_log)
+        
+        # Frame cache: with a budget, the flower animates on a loop and idle frames replay from memory
+        self.frame_cache = AnimationCache(frame_cache_mb << 20) if frame_cache_mb > 0 else None
         
         # Initialize color system
         self.initialize_color_system()
@@ -452,7 +1919,8 @@ class InteractiveFlowerApp:
         self.target_colors = self.current_colors.copy()
     
     def handle_events(self):
-        """Handle user input events"""
+        """Handle user input events; mouse clicks are collected and coalesced once per frame"""
+        clicks = []
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
@@ -479,7 +1947,7 @@ class InteractiveFlowerApp:
                 elif event.key == pygame.K_a:
                     # A key: toggle auto advance
                     self.auto_advance = not self.auto_advance
-                    self.auto_advance_timer = 0
+                    self.auto_advance_timer = 0.0
                 elif event.key == pygame.K_c:
                     # C key: toggle color mode
                     self.custom_color_mode = not self.custom_color_mode
@@ -494,14 +1962,36 @@ class InteractiveFlowerApp:
                 elif event.key == pygame.K_v:
                     # V key: start/stop video recording
                     self.toggle_video_recording()
+                elif event.key == pygame.K_f:
+                    # F key: cycle video recording format
+                    self.next_recording_preset()
                 elif event.key == pygame.K_x:
                     # X key: clear all mouse effects
                     self.clear_mouse_effects()
+                elif event.key == pygame.K_d:
+                    # D key: toggle dirty-rect display updates
+                    self.dirty_rect_mode = not self.dirty_rect_mode
+                    self.full_redraw = True
+                elif event.key == pygame.K_b:
+                    # B key: switch the petal rendering backend
+                    self.next_render_backend()
+                elif event.key == pygame.K_l:
+                    # L key: toggle the frame governor
+                    self.toggle_governor()
+                elif event.key == pygame.K_p:
+                    # P key: toggle the frame profiler overlay
+                    self.toggle_profiler_overlay()
+                elif event.key == pygame.K_g:
+                    # G key: toggle the multi-flower gallery view
+                    self.toggle_gallery_view()
             
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left mouse button
-                    self.handle_mouse_click(event.pos)
+                    clicks.append(event.pos)
         
+        # All clicks of the frame are handled together, however many arrived
+        if clicks:
+            self.handle_mouse_clicks(clicks)
         return True
     
     def previous_sample(self):
@@ -510,14 +2000,10 @@ class InteractiveFlowerApp:
         self.clear_mouse_effects()
         
         if self.current_species_filter:
-            samples = self.iris_data.get_species_samples(self.current_species_filter)
-            if samples:
-                current_sample = self.iris_data.get_sample_by_index(self.current_sample_index)
-                current_index_in_species = samples.index(current_sample) if current_sample in samples else 0
-                new_index = (current_index_in_species - 1) % len(samples)
-                self.current_sample_index = samples[new_index]['id'] - 1
+            self.current_sample_index = self.iris_data.step_species_sample(
+                self.current_sample_index, self.current_species_filter, -1)
         else:
-            self.current_sample_index = (self.current_sample_index - 1) % len(self.iris_data.data)
+            self.current_sample_index = (self.current_sample_index - 1) % self.iris_data.size
     
     def next_sample(self):
         """Switch to next sample"""
@@ -525,14 +2011,10 @@ class InteractiveFlowerApp:
         self.clear_mouse_effects()
         
         if self.current_species_filter:
-            samples = self.iris_data.get_species_samples(self.current_species_filter)
-            if samples:
-                current_sample = self.iris_data.get_sample_by_index(self.current_sample_index)
-                current_index_in_species = samples.index(current_sample) if current_sample in samples else 0
-                new_index = (current_index_in_species + 1) % len(samples)
-                self.current_sample_index = samples[new_index]['id'] - 1
+            self.current_sample_index = self.iris_data.step_species_sample(
+                self.current_sample_index, self.current_species_filter, 1)
         else:
-            self.current_sample_index = (self.current_sample_index + 1) % len(self.iris_data.data)
+            self.current_sample_index = (self.current_sample_index + 1) % self.iris_data.size
     
     def previous_species(self):
         """Switch to previous species"""
@@ -555,9 +2037,9 @@ class InteractiveFlowerApp:
         else:
             self.current_species_filter = selected_species
             # Switch to first sample of this species
-            samples = self.iris_data.get_species_samples(selected_species)
-            if samples:
-                self.current_sample_index = samples[0]['id'] - 1
+            indices = self.iris_data.get_species_indices(selected_species)
+            if len(indices):
+                self.current_sample_index = int(indices[0])
     
     def random_sample(self):
         """Randomly select sample"""
@@ -568,15 +2050,15 @@ class InteractiveFlowerApp:
             sample = self.iris_data.get_random_sample(self.current_species_filter)
         else:
             sample = self.iris_data.get_random_sample()
-        self.current_sample_index = sample['id'] - 1
+        self.current_sample_index = sample.index
     
-    def update_auto_advance(self):
-        """Update auto advance"""
+    def update_auto_advance(self, dt: float):
+        """Update auto advance by one simulation step of dt seconds"""
         if self.auto_advance and self.is_playing:
-            self.auto_advance_timer += 1
-            if self.auto_advance_timer >= self.auto_advance_delay:
+            self.auto_advance_timer += dt
+            if self.auto_advance_timer >= self.auto_advance_delay - 1e-9:
                 self.next_sample()
-                self.auto_advance_timer = 0
+                self.auto_advance_timer = 0.0
     
     def previous_color_scheme(self):
         """Switch to previous color scheme"""
@@ -609,24 +2091,166 @@ class InteractiveFlowerApp:
         else:
             self.stop_video_recording()
     
-    def start_video_recording(self):
-        """Start recording video"""
-        self.is_recording = True
-        self.video_frames = []
-        self.recording_frame_count = 0
-        print("Video recording started...")
+    def get_recording_format(self) -> Tuple[str, int, Tuple[int, int]]:
+        """Get the selected recording preset as (label, fps, (width, height))"""
+        label, fps, output_height = RECORDING_PRESETS[self.recording_preset_index]
+        if output_height is None:
+            return label, fps, (self.width, self.height)
+        # Keep the window's aspect ratio; video encoders want even dimensions
+        output_width = int(round(self.width * output_height / self.height / 2)) * 2
+        return label, fps, (output_width, output_height)
     
-    def stop_video_recording(self):
-        """Stop recording and save video"""
-        if not self.is_recording:
+    def next_recording_preset(self):
+        """Cycle the video recording format (applies to the next recording)"""
+        if self.is_recording:
             return
+        self.recording_preset_index = (self.recording_preset_index + 1) % len(RECORDING_PRESETS)
+        print(f"Recording format: {self.get_recording_format()[0]}")
+    
+    def toggle_governor(self):
+        """Toggle the frame governor (lowers quality step by step while frames run over budget)"""
+        self.governor.enabled = not self.governor.enabled
+        self.governor.set_level(0)
+        self.apply_quality_level()
+        print(f"Frame governor: {'on' if self.governor.enabled else 'off'}")
+    
+    def update_governor(self, frame_ms: float):
+        """Feed the frame's work time to the governor and apply its quality level"""
+        if self.governor.update(frame_ms):
+            self.apply_quality_level()
+    
+    def apply_quality_level(self):
+        """Configure the visualizer for the governor's current quality level"""
+        settings = self.governor.settings()
+        if self.lod_quality is not None:
+            self.visualizer.lod_quality = self.lod_quality * settings['detail']
+        self.visualizer.antialias = settings['antialias']
+        self.visualizer.max_layers = settings['max_layers']
+        self.visualizer.max_clicks = settings['max_clicks']
+    
+    def toggle_profiler_overlay(self):
+        """Show or hide the frame profiler overlay"""
+        self.show_profiler = not self.show_profiler
+        self.profiler_lines = []
+        print(f"Profiler overlay: {'on' if self.show_profiler else 'off'}")
+    
+    def draw_profiler_overlay(self, screen) -> pygame.Rect:
+        """Draw p50/p95/p99 stage times and the latest frame's counters in the top-left corner"""
+        profiler = self.profiler
+        if not self.profiler_lines or profiler.frames % self.PROFILER_REFRESH_FRAMES == 0:
+            rows = [("stage (ms)", "p50", "p95", "p99")]
+            for column, values in zip(profiler.columns, profiler.percentiles().T):
+                rows.append((column,) + tuple(f"{value:.2f}" for value in values))
+            counters = profiler.latest_counters()
+            rows.append((f"points {counters['points']}  draw calls {counters['draw_calls']}"
+                         f"  quality {self.governor.label}",))
+            rows.append(("cache hits  " + "  ".join(f"{name} {100 * hits / max(hits + misses, 1):.0f}%"
+                                                    for name, hits, misses in self.cache_stats()),))
+            self.profiler_lines = rows
         
-        self.is_recording = False
+        # Stage names left-aligned, percentile columns right-aligned
+        rect = pygame.Rect(10, 10, 0, 0)
+        y = rect.y
+        for row in self.profiler_lines:
+            rect.union_ip(screen.blit(self.profiler_text.render(row[0], LIGHT_GRAY), (rect.x, y)))
+            for column, cell in enumerate(row[1:], 1):
+                text = self.profiler_text.render(cell, LIGHT_GRAY)
+                rect.union_ip(screen.blit(text, text.get_rect(topright=(rect.x + 110 + 50 * column, y))))
+            y += self.profiler_font.get_linesize()
+        return rect
+    
+    def cache_stats(self) -> List[Tuple[str, int, int]]:
+        """(name, hits, misses) of the render caches, for the profiler overlay"""
+        stats = [('text', self.text_cache.hits, self.text_cache.misses),
+                 ('ripples', self.ripple_sprites.hits, self.ripple_sprites.misses)]
+        if self.frame_cache is not None:
+            stats.append(('frames', self.frame_cache.hits, self.frame_cache.misses))
+        return stats
+    
+    def toggle_gallery_view(self):
+        """Switch between the single flower and the gallery of the current page of samples"""
+        self.clear_mouse_effects()
+        self.view_mode = 'single' if self.view_mode == 'gallery' else 'gallery'
+        self.full_redraw = True
+        print(f"View: {self.view_mode}")
+    
+    def gallery_indices(self) -> np.ndarray:
+        """Sample indices on the gallery page holding the current sample (within the species filter)"""
+        if self.current_species_filter:
+            indices = self.iris_data.get_species_indices(self.current_species_filter)
+            position = self.iris_data.get_species_position(self.current_sample_index,
+                                                           self.current_species_filter) or 0
+        else:
+            indices = None
+            position = self.current_sample_index
+        count = len(indices) if indices is not None else self.iris_data.size
+        start = (position // GALLERY_PAGE_SIZE) * GALLERY_PAGE_SIZE
+        stop = min(start + GALLERY_PAGE_SIZE, count)
+        return np.arange(start, stop) if indices is None else np.asarray(indices[start:stop])
+    
+    def draw_gallery(self, screen, scale_factor) -> pygame.Rect:
+        """Draw the current gallery page and outline the selected sample's cell"""
+        indices = self.gallery_indices()
+        rect = pygame.Rect(0, 0, self.width - 300, self.height)
+        centers, cell = self.visualizer.gallery_layout(len(indices), rect)
+        drawn = self.visualizer.draw_gallery(screen, rect, self.iris_data.visual_table[indices], centers, cell,
+                                             self.current_colors, self.render_t, scale_factor)
+        selected = np.flatnonzero(indices == self.current_sample_index)
+        if len(selected):
+            x, y = centers[selected[0]]
+            outline = pygame.Rect(0, 0, int(cell) - 2, int(cell) - 2)
+            outline.center = (int(x), int(y))
+            pygame.draw.rect(screen, WHITE, outline, 1)
+            drawn = drawn.union(outline)
+        return drawn
+    
+    def draw_looping_flower(self, screen) -> pygame.Rect:
+        """Draw the current flower at loop frame t % ANIMATION_LOOP_FRAMES, replaying cached frames while idle"""
+        frame = self.t % ANIMATION_LOOP_FRAMES
+        color_t = frame * ANIMATION_COLOR_SCALE
+        center_x, center_y = (self.width - 300) // 2, self.height // 2
+        visual_params = self.iris_data.get_visual_params(self.current_sample_index)
+        scale_factor = breathing_scale_factor(frame, self.scale_animation_speed, self.scale_range)
         
-        if len(self.video_frames) == 0:
-            print("No frames to save")
-            return
+        if len(self.clicks) or self.color_transition_active:
+            field = self.clicks.field()
+            field = DeformationField(field.sources - [0, 0, self.t - frame, 0])
+            return self.visualizer.draw_data_driven_flower(
+                screen, center_x, center_y, visual_params, self.current_colors, frame, field, scale_factor,
+                color_t=color_t)
         
+        key = (self.current_sample_index, self.visualizer.palette.stops_array(self.current_colors).tobytes(),
+               self.visualizer.render_backend, self.visualizer.lod_quality, self.visualizer.antialias,
+               self.visualizer.max_layers)
+        cached = self.frame_cache.get(key, frame)
+        if cached is not None:
+            rect, surface = cached
+            screen.blit(surface, rect)
+            self.visualizer.stats['draw_calls'] += 1
+            return rect
+        rect = self.visualizer.draw_data_driven_flower(
+            screen, center_x, center_y, visual_params, self.current_colors, frame, None, scale_factor,
+            color_t=color_t)
+        self.frame_cache.put(key, frame, screen, rect)
+        return rect
+    
+    def select_gallery_cell(self, pos):
+        """Make the sample in the clicked gallery cell the current one"""
+        indices = self.gallery_indices()
+        centers, cell = self.visualizer.gallery_layout(len(indices), pygame.Rect(0, 0, self.width - 300, self.height))
+        distance = np.abs(centers - np.asarray(pos)).max(axis=1)
+        nearest = int(np.argmin(distance))
+        if distance[nearest] <= cell / 2:
+            self.current_sample_index = int(indices[nearest])
+    
+    def next_render_backend(self):
+        """Cycle the petal rendering backend (pygame lines or the NumPy rasterizer)"""
+        index = RENDER_BACKENDS.index(self.visualizer.render_backend)
+        self.visualizer.render_backend = RENDER_BACKENDS[(index + 1) % len(RENDER_BACKENDS)]
+        print(f"Render backend: {self.visualizer.render_backend}")
+    
+    def start_video_recording(self):
+        """Start recording video"""
         # Create videos directory if it doesn't exist
         if not os.path.exists("videos"):
             os.makedirs("videos")
@@ -640,67 +2264,55 @@ class InteractiveFlowerApp:
         filename = f"videos/iris_flower_{species_name}_sample{sample_id}_{timestamp}.mp4"
         
         # Video settings
-        fps = 30  # Reduce to 30 FPS for better compatibility
-        height, width = self.video_frames[0].shape[:2]
-        
-        # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        video_writer = cv2.VideoWriter(filename, fourcc, fps, (width, height))
-        
-        # Write frames
-        for frame in self.video_frames:
-            # Convert from RGB to BGR for OpenCV
-            frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            video_writer.write(frame_bgr)
+        label, fps, frame_size = self.get_recording_format()
+        self.video_recorder = VideoRecorder(filename, frame_size, fps,
+                                            self.recording_queue_size, self.recording_backpressure)
+        self.is_recording = True
+        print(f"Video recording started ({label}, {frame_size[0]}x{frame_size[1]})...")
+    
+    def stop_video_recording(self):
+        """Stop recording; the file is finished by the encoder thread in the background"""
+        if not self.is_recording:
+            return
         
-        video_writer.release()
-        print(f"Video saved as: {filename}")
-        print(f"Recorded {len(self.video_frames)} frames ({len(self.video_frames)/fps:.1f} seconds)")
+        self.is_recording = False
+        self.video_recorder.stop()
+        print("Video recording stopped, finishing file in the background...")
     
     def capture_frame(self):
         """Capture current frame for video recording"""
         if self.is_recording:
-            # Convert pygame surface to numpy array
-            frame_data = pygame.surfarray.array3d(self.screen)
-            # Transpose to get correct orientation (pygame uses (width, height, channels))
-            frame_data = np.transpose(frame_data, (1, 0, 2))
-            self.video_frames.append(frame_data)
-            self.recording_frame_count += 1
+            # Pick output frames by timestamp, then read the display surface into the recorder's ring buffer
+            if self.recording_timebase == 'sim':
+                timestamp = self.render_t / SIMULATION_RATE
+            else:
+                timestamp = time.perf_counter()
+            self.video_recorder.capture(self.screen, timestamp)
             
-            # Auto-stop after recording_duration frames
-            if self.recording_frame_count >= self.recording_duration:
+            # Auto-stop after recording_duration seconds of video
+            if self.video_recorder.duration >= self.recording_duration:
                 self.stop_video_recording()
     
     def handle_mouse_click(self, pos):
-        """Handle mouse click and create visual effect with color transition"""
-        x, y = pos
-        
+        """Handle one mouse click (see handle_mouse_clicks)"""
+        self.handle_mouse_clicks([pos])
+    
+    def handle_mouse_clicks(self, positions: List[Tuple[int, int]]):
+        """Handle a frame's mouse clicks: one ripple and deformation source per group of nearby clicks, and a color transition"""
         # Only respond to clicks in the main visualization area (not UI)
-        if x < WIDTH - 300:
-            click_effect = {
-                'x': x,
-                'y': y,
-                'age': 0,
-                'intensity': 1.0,
-                'radius': 0
-            }
-            self.click_effects.append(click_effect)
-            
-            # Store click for flower deformation
-            click_data = {
-                'x': x,
-                'y': y,
-                'time': self.t,
-                'strength': 1.0
-            }
-            self.mouse_clicks.append(click_data)
-            
-            # Trigger color transition to next color scheme
-            self.start_color_transition()
-            
-            # Remove old clicks
-            if len(self.mouse_clicks) > self.max_click_history:
-                self.mouse_clicks.pop(0)
+        positions = [pos for pos in positions if pos[0] < WIDTH - 300]
+        if not positions:
+            return
+        if self.view_mode == 'gallery':
+            self.select_gallery_cell(positions[-1])
+            return
+        
+        # One ripple and one deformation source per group of nearby clicks
+        xs, ys, counts = np.array(merge_clicks(positions), dtype=np.float64).T
+        self.clicks.add(xs, ys, self.t, np.minimum(counts, CLICK_MAX_STRENGTH))
+        
+        # Trigger color transition to next color scheme
+        self.start_color_transition()
     
     def start_color_transition(self, target_index=None):
         """Start a smooth color transition to the next color scheme or specified index"""
@@ -719,10 +2331,10 @@ class InteractiveFlowerApp:
             self.color_transition_active = True
             self.color_transition_progress = 0.0
     
-    def update_color_transition(self):
-        """Update the gradual color transition between color schemes"""
+    def update_color_transition(self, dt: float):
+        """Advance the gradual color transition between color schemes by one simulation step of dt seconds"""
         if self.color_transition_active:
-            self.color_transition_progress += self.color_transition_speed
+            self.color_transition_progress += self.color_transition_speed * dt
             
             # Apply easing function for smoother transition
             eased_progress = self.color_transition_progress * self.color_transition_progress * (3.0 - 2.0 * self.color_transition_progress)
@@ -746,81 +2358,124 @@ class InteractiveFlowerApp:
                 self.color_transition_progress = 0.0
                 self.current_colors = self.target_colors.copy()
     
-    def update_click_effects(self):
-        """Update and age click effects"""
-        for effect in self.click_effects[:]:  # Copy list to safely modify during iteration
-            effect['age'] += 1
-            effect['intensity'] = 1.0 - (effect['age'] / self.click_effect_duration)
-            effect['radius'] = effect['age'] * 2
-            
-            # Remove expired effects
-            if effect['age'] >= self.click_effect_duration:
-                self.click_effects.remove(effect)
-        
-        # Age mouse clicks
-        for click in self.mouse_clicks[:]:
-            click['strength'] = max(0, 1.0 - (self.t - click['time']) / self.click_deform_duration)  # Faster decay
-            if click['strength'] <= 0:
-                self.mouse_clicks.remove(click)
+    def update_click_effects(self, dt: float):
+        """Age click effects by one simulation step of dt seconds"""
+        # Click times are in animation steps, so deformation freezes while paused (ripples keep going)
+        self.clicks.update(dt, self.t, self.click_deform_duration * SIMULATION_RATE, self.click_effect_duration)
     
     def clear_mouse_effects(self):
         """Clear all mouse interaction effects"""
-        self.mouse_clicks.clear()
-        self.click_effects.clear()
-    
-    def draw_click_effects(self, screen):
-        """Draw visual effects from mouse clicks"""
-        for effect in self.click_effects:
-            if effect['intensity'] > 0:
-                # Draw expanding circle
-                alpha = int(255 * effect['intensity'])
-                color = (255, 255, 255, alpha)
-                
-                # Create a surface with per-pixel alpha
-                effect_surface = pygame.Surface((effect['radius'] * 2, effect['radius'] * 2), pygame.SRCALPHA)
-                
-                # Draw outer ring
-                if effect['radius'] > 5:
-                    pygame.draw.circle(effect_surface, (*color[:3], alpha//2), 
-                                     (effect['radius'], effect['radius']), 
-                                     int(effect['radius']), 3)
-                
-                # Draw inner glow
-                if effect['radius'] > 2:
-                    pygame.draw.circle(effect_surface, (*color[:3], alpha//4), 
-                                     (effect['radius'], effect['radius']), 
-                                     int(effect['radius']//2))
-                
-                # Blit to screen
-                screen.blit(effect_surface, (effect['x'] - effect['radius'], effect['y'] - effect['radius']))
+        self.clicks.clear()
     
-    def draw_ui(self, screen):
-        """Draw user interface"""
-        # UI background area
-        ui_rect = pygame.Rect(WIDTH - 300, 0, 300, HEIGHT)
-        pygame.draw.rect(screen, (20, 20, 20), ui_rect)
-        pygame.draw.line(screen, WHITE, (WIDTH - 300, 0), (WIDTH - 300, HEIGHT), 2)
-        
-        # Current sample information
+    def draw_click_effects(self, screen) -> List[pygame.Rect]:
+        """Draw visual effects from mouse clicks as cached sprite blits, returning the rectangles they cover"""
+        ripples = self.clicks.ripples(self.click_effect_duration, self.click_effect_speed, self.max_click_effects)
+        blits = []
+        for x, y, radius, intensity in zip(*(column.tolist() for column in ripples)):
+            if intensity > 0:
+                # Expanding ring and glow, fading out with the ripple's age
+                sprite = self.ripple_sprites.render(radius, int(255 * intensity))
+                blits.append((sprite, (x - radius, y - radius)))
+        return screen.blits(blits) if blits else []
+    
+    # Frame profiler: stages of run() in order, and how often the overlay text is refreshed
+    PROFILER_STAGES = ('events', 'color_transition', 'auto_advance', 'click_update', 'clear', 'flower',
+                       'click_draw', 'overlay', 'ui', 'capture', 'present')
+    PROFILER_REFRESH_FRAMES = 15
+    
+    # Side panel layout (y offsets inside the panel)
+    UI_CONTROLS = [
+        "Controls:",
+        "Space: Pause/Resume",
+        "←/→: Sample  ↑/↓: Species",
+        "R: Random Sample",
+        "A: Auto Advance",
+        "C: Toggle Color Mode",
+        "1/2: Change Color Theme",
+        "V: Record Video (5s)",
+        "F: Recording Format",
+        "Click: Switch color scheme",
+        "Mouse: Deform  X: Clear",
+        "D: Dirty-rect Updates",
+        "B: Render Backend",
+        "L: Frame Governor",
+        "G: Gallery View",
+        "P: Profiler Overlay"
+    ]
+    UI_SECTION_TOPS = {'sample': 60, 'species': 270, 'color': 415}
+    UI_SECTION_HEIGHTS = {'sample': 160, 'species': 100, 'color': 75}
+    UI_CONTROL_SPACING = 16  # The controls list has to end above the status line at the bottom of the panel
+    
+    def get_ui_section_keys(self) -> Dict[str, Tuple]:
+        """State that each side panel section depends on; a section is redrawn when its key changes"""
         current_sample = self.iris_data.get_sample_by_index(self.current_sample_index)
+        sample_key = None
         if current_sample:
-            y_offset = 20
-            
-            # Title
-            title_text = self.font.render("Iris Data Visualization", True, WHITE)
-            screen.blit(title_text, (WIDTH - 290, y_offset))
-            y_offset += 40
-            
+            sample_key = (current_sample['id'], current_sample['species'],
+                          *(current_sample[feature] for feature in FEATURES))
+        
+        status_items = []
+        if not self.is_playing:
+            status_items.append("PAUSED")
+        if self.auto_advance:
+            status_items.append("AUTO")
+        if self.governor.enabled:
+            status_items.append(f"QUALITY {self.governor.label}")
+        if self.is_recording:
+            progress = (self.video_recorder.duration / self.recording_duration) * 100
+            dropped = self.video_recorder.frames_dropped
+            status_items.append(f"RECORDING {progress:.0f}%" + (f" ({dropped} dropped)" if dropped else ""))
+            status_items.append(f"CAP {self.video_recorder.capture_ms:.1f}ms")
+        elif self.video_recorder and not self.video_recorder.is_finished:
+            status_items.append("SAVING VIDEO")  # The encoder thread is still writing the stopped recording
+
+        return {
+            'layout': (self.custom_color_mode,),
+            'sample': sample_key,
+            'species': (self.selected_species_index,),
+            'color': (self.custom_color_mode, self.selected_color_index),
+            'status': (" | ".join(status_items), self.is_recording)
+        }
+    
+    def build_ui_panel(self) -> pygame.Surface:
+        """Composite the static parts of the side panel: background, headings and controls"""
+        panel = pygame.Surface((300, HEIGHT))
+        panel.fill((20, 20, 20))
+        pygame.draw.line(panel, WHITE, (0, 0), (0, HEIGHT), 2)
+        
+        text = self.text_cache.render
+        panel.blit(text("Iris Data Visualization", WHITE), (10, 20))
+        panel.blit(text("Species Filter:", WHITE), (10, 240))
+        panel.blit(text("Color Controls:", WHITE), (10, 390))
+        
+        # Control instructions (the color section is shorter in auto mode)
+        y_offset = 500 if self.custom_color_mode else 490
+        for i, control in enumerate(self.UI_CONTROLS):
+            panel.blit(text(control, WHITE if i == 0 else GRAY), (10, y_offset))
+            y_offset += self.UI_CONTROL_SPACING
+        self.ui_status_top = y_offset + 10
+        return panel
+    
+    def draw_ui_section(self, panel: pygame.Surface, name: str) -> pygame.Rect:
+        """Clear one dynamic side panel section and draw it from cached text surfaces; returns its panel rect"""
+        text = self.text_cache.render
+        if name == 'status':
+            top, height = self.ui_status_top, HEIGHT - self.ui_status_top
+        else:
+            top, height = self.UI_SECTION_TOPS[name], self.UI_SECTION_HEIGHTS[name]
+        section_rect = pygame.Rect(2, top, 298, height)
+        panel.fill((20, 20, 20), section_rect)
+        y_offset = top
+        
+        if name == 'sample':
+            current_sample = self.iris_data.get_sample_by_index(self.current_sample_index)
+            if not current_sample:
+                return section_rect
             # Sample ID and species
-            sample_info = f"Sample #{current_sample['id']}"
             species_name = current_sample['species'].replace('Iris-', '')
-            
-            sample_text = self.font.render(sample_info, True, WHITE)
-            screen.blit(sample_text, (WIDTH - 290, y_offset))
+            panel.blit(text(f"Sample #{current_sample['id']}", WHITE), (10, y_offset))
             y_offset += 25
-            
-            species_text = self.font.render(f"Species: {species_name}", True, LIGHT_GRAY)
-            screen.blit(species_text, (WIDTH - 290, y_offset))
+            panel.blit(text(f"Species: {species_name}", LIGHT_GRAY), (10, y_offset))
             y_offset += 35
             
             # Feature data
@@ -830,177 +2485,436 @@ class InteractiveFlowerApp:
                 ("Petal Length", f"{current_sample['petal_length']:.1f} cm"),
                 ("Petal Width", f"{current_sample['petal_width']:.1f} cm")
             ]
-            
             for feature_name, value in features:
-                feature_text = self.font.render(f"{feature_name}: {value}", True, GRAY)
-                screen.blit(feature_text, (WIDTH - 290, y_offset))
+                panel.blit(text(f"{feature_name}: {value}", GRAY), (10, y_offset))
                 y_offset += 25
-            
-            y_offset += 20
-            
+        
+        elif name == 'species':
             # Species filter
-            filter_title = self.font.render("Species Filter:", True, WHITE)
-            screen.blit(filter_title, (WIDTH - 290, y_offset))
-            y_offset += 30
-            
             for i, species in enumerate(self.species_list):
                 color = WHITE if i == self.selected_species_index else GRAY
                 display_name = species if species == 'All' else species.replace('Iris-', '')
-                species_text = self.font.render(f"{'>' if i == self.selected_species_index else ' '} {display_name}", True, color)
-                screen.blit(species_text, (WIDTH - 280, y_offset))
+                marker = '>' if i == self.selected_species_index else ' '
+                panel.blit(text(f"{marker} {display_name}", color), (20, y_offset))
                 y_offset += 25
-            
-            y_offset += 20
-            
+        
+        elif name == 'color':
             # Color scheme controls
-            color_title = self.font.render("Color Controls:", True, WHITE)
-            screen.blit(color_title, (WIDTH - 290, y_offset))
-            y_offset += 25
-            
             mode_text = "Manual" if self.custom_color_mode else "Auto"
             mode_color = (0, 255, 0) if self.custom_color_mode else (255, 165, 0)
-            mode_surface = self.font.render(f"Mode: {mode_text}", True, mode_color)
-            screen.blit(mode_surface, (WIDTH - 290, y_offset))
+            panel.blit(text(f"Mode: {mode_text}", mode_color), (10, y_offset))
             y_offset += 25
             
             if self.custom_color_mode:
                 current_scheme = self.color_schemes[self.selected_color_index]
-                scheme_surface = self.font.render(f"Theme: {current_scheme}", True, LIGHT_GRAY)
-                screen.blit(scheme_surface, (WIDTH - 290, y_offset))
+                panel.blit(text(f"Theme: {current_scheme}", LIGHT_GRAY), (10, y_offset))
                 y_offset += 25
                 
                 # Draw color preview squares
                 scheme_colors = self.visualizer.get_enhanced_color_schemes()[current_scheme]
-                preview_y = y_offset
-                for i, (color_name, color) in enumerate(scheme_colors.items()):
-                    rect_x = WIDTH - 290 + i * 35
-                    rect = pygame.Rect(rect_x, preview_y, 30, 15)
-                    pygame.draw.rect(screen, color, rect)
-                    pygame.draw.rect(screen, WHITE, rect, 1)
-                y_offset += 25
+                for i, color in enumerate(scheme_colors.values()):
+                    rect = pygame.Rect(10 + i * 35, y_offset, 30, 15)
+                    pygame.draw.rect(panel, color, rect)
+                    pygame.draw.rect(panel, WHITE, rect, 1)
             else:
-                auto_text = self.font.render("Auto: Each sample has", True, GRAY)
-                screen.blit(auto_text, (WIDTH - 290, y_offset))
-                y_offset += 20
-                auto_text2 = self.font.render("unique colors", True, GRAY)
-                screen.blit(auto_text2, (WIDTH - 290, y_offset))
+                panel.blit(text("Auto: Each sample has", GRAY), (10, y_offset))
                 y_offset += 20
-            
-            y_offset += 10
-            
-            # Control instructions
-            controls = [
-                "Controls:",
-                "Space: Pause/Resume",
-                "←/→: Switch Sample",
-                "↑/↓: Switch Species",
-                "R: Random Sample",
-                "A: Auto Advance",
-                "C: Toggle Color Mode",
-                "1/2: Change Color Theme",
-                "V: Record Video (5s)",
-                "Click: Switch color scheme",
-                "Mouse: Click to deform",
-                "X: Clear deformations"
-            ]
-            
-            for i, control in enumerate(controls):
-                color = WHITE if i == 0 else GRAY
-                control_text = self.font.render(control, True, color)
-                screen.blit(control_text, (WIDTH - 290, y_offset))
-                y_offset += 25
-            
+                panel.blit(text("unique colors", GRAY), (10, y_offset))
+        
+        elif name == 'status':
             # Status indicators
-            y_offset += 20
-            status_items = []
-            if not self.is_playing:
-                status_items.append("PAUSED")
-            if self.auto_advance:
-                status_items.append("AUTO")
-            if self.is_recording:
-                progress = (self.recording_frame_count / self.recording_duration) * 100
-                status_items.append(f"RECORDING {progress:.0f}%")
-            
-            if status_items:
-                status_text = " | ".join(status_items)
-                status_color = (255, 0, 0) if self.is_recording else (255, 255, 0)
-                status_surface = self.font.render(status_text, True, status_color)
-                screen.blit(status_surface, (WIDTH - 290, y_offset))
+            status_text, recording = self.ui_section_keys['status']
+            if status_text:
+                status_color = (255, 0, 0) if recording else (255, 255, 0)
+                panel.blit(text(status_text, status_color), (10, y_offset))
+        return section_rect
+    
+    def draw_ui(self, screen) -> List[pygame.Rect]:
+        """Draw user interface from the cached panel, redrawing only changed sections; returns the changed screen rectangles"""
+        panel_rect = pygame.Rect(WIDTH - 300, 0, 300, HEIGHT)
+        changed = []
+        section_keys = self.get_ui_section_keys()
+        if self.ui_panel is None or section_keys['layout'] != self.ui_section_keys.get('layout'):
+            self.ui_panel = self.build_ui_panel()
+            self.ui_section_keys = {'layout': section_keys['layout']}
+            changed.append(panel_rect)
+        
+        for name, key in section_keys.items():
+            if name != 'layout' and self.ui_section_keys.get(name, ()) != key:
+                self.ui_section_keys[name] = key
+                changed.append(self.draw_ui_section(self.ui_panel, name).move(panel_rect.x, 0))
+        
+        screen.blit(self.ui_panel, panel_rect)
+        return changed
+    
+    def present_frame(self, drawn_rects: List[pygame.Rect], ui_rects: List[pygame.Rect]):
+        """Push the frame to the display, updating only dirty regions in dirty-rect mode"""
+        screen_rect = self.screen.get_rect()
+        drawn_rects = [rect.clip(screen_rect) for rect in drawn_rects]
+        if self.dirty_rect_mode and not self.full_redraw:
+            # Old and new flower/effect areas, plus the UI regions that changed
+            pygame.display.update(self.previous_dirty_rects + drawn_rects + ui_rects)
+        else:
+            pygame.display.flip()
+            self.full_redraw = False
+        self.previous_dirty_rects = drawn_rects
     
     def run(self):
         """Main execution loop"""
         running = True
         
+        profiler = self.profiler
         while running:
+            frame_start = time.perf_counter()
+            profiler.begin_frame()
+            
             # Handle events
             running = self.handle_events()
+            profiler.mark('events')
             
-            # Update state
-            if self.is_playing:
-                self.t += 1
-            
-            # Update color transition system
-            self.update_color_transition()
-            
-            self.update_auto_advance()
-            
-            # Update click effects
-            self.update_click_effects()
+            # Update state in fixed simulation steps for the real time the last frame took
+            dt = self.sim_clock.dt
+            for _ in range(self.sim_clock.advance(self.frame_seconds)):
+                if self.is_playing:
+                    self.t += 1
+                
+                # Update color transition system
+                self.update_color_transition(dt)
+                profiler.mark('color_transition')
+                
+                self.update_auto_advance(dt)
+                profiler.mark('auto_advance')
+                
+                # Update click effects
+                self.update_click_effects(dt)
+                profiler.mark('click_update')
+            self.render_t = self.t + (self.sim_clock.alpha if self.is_playing else 0.0)
             
-            # Render
-            self.screen.fill(BG_COLOR)
+            # Render: clear the whole window, or only what was drawn last frame
+            if self.dirty_rect_mode and not self.full_redraw:
+                for rect in self.previous_dirty_rects:
+                    self.screen.fill(BG_COLOR, rect)
+            else:
+                self.screen.fill(BG_COLOR)
+            drawn_rects = []
+            profiler.mark('clear')
             
             # Draw current flower with mouse interaction
             current_sample = self.iris_data.get_sample_by_index(self.current_sample_index)
-            if current_sample:
+            if current_sample and self.view_mode == 'gallery':
+                scale_factor = breathing_scale_factor(self.render_t, self.scale_animation_speed, self.scale_range)
+                drawn_rects.append(self.draw_gallery(self.screen, scale_factor))
+            elif current_sample and self.frame_cache is not None:
+                drawn_rects.append(self.draw_looping_flower(self.screen))
+            elif current_sample:
                 # Use current transitioning colors as the base color scheme
                 # The get_dynamic_color method will create color variations within this scheme
                 colors = self.current_colors
                 
-                # Map sample data to visual parameters
-                visual_params = self.visualizer.map_data_to_visual(current_sample)
+                # Look up the sample's precomputed visual parameters
+                visual_params = self.iris_data.get_visual_params(self.current_sample_index)
                 
                 # Center the flower in the left display area (not entire screen)
                 display_area_width = self.width - 300  # Left area excluding UI panel
                 center_x = display_area_width // 2
                 center_y = self.height // 2
                 
-                # Calculate smoother auto scaling factor (breathing effect using cosine for smoothness)
-                breathing_cycle = self.t * self.scale_animation_speed
-                # Use cosine for smoother breathing, with easing function
-                raw_scale = math.cos(breathing_cycle)
-                # Apply easing function for even smoother transitions
-                eased_scale = raw_scale * raw_scale * raw_scale  # Cubic easing
-                scale_factor = 1.0 + self.scale_range * eased_scale
+                # Breathing animation
+                scale_factor = breathing_scale_factor(self.render_t, self.scale_animation_speed, self.scale_range)
                 
                 # Pass mouse data and scale factor for animation
-                self.visualizer.draw_data_driven_flower(self.screen, center_x, center_y, visual_params, colors, self.t, self.mouse_clicks, scale_factor)
+                drawn_rects.append(self.visualizer.draw_data_driven_flower(
+                    self.screen, center_x, center_y, visual_params, colors, self.render_t, self.clicks.field(),
+                    scale_factor))
+            profiler.mark('flower')
             
             # Draw click effects
-            self.draw_click_effects(self.screen)
+            effect_rects = self.draw_click_effects(self.screen)
+            drawn_rects.extend(effect_rects)
+            profiler.mark('click_draw')
+            
+            # Profiler overlay
+            if self.show_profiler:
+                drawn_rects.append(self.draw_profiler_overlay(self.screen))
+            profiler.mark('overlay')
             
             # Draw UI
-            self.draw_ui(self.screen)
+            ui_rects = self.draw_ui(self.screen)
+            profiler.mark('ui')
             
             # Capture frame for video recording if recording
             self.capture_frame()
+            profiler.mark('capture')
             
             # Update display
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            self.present_frame(drawn_rects, ui_rects)
+            profiler.mark('present')
+            
+            counters = self.visualizer.take_stats()
+            counters['draw_calls'] += len(effect_rects) + 1 + len(ui_rects)  # Effect and panel blits
+            counters['quality_level'] = self.governor.level
+            profiler.end_frame(counters)
+            self.update_governor((time.perf_counter() - frame_start) * 1000)
+            self.clock.tick(self.render_fps)
+            self.frame_seconds = time.perf_counter() - frame_start
         
         pygame.quit()
+        profiler.close_log()
         
-        # Clean up any ongoing recording
+        # Clean up any ongoing recording and let the encoder thread finish the file
         if self.is_recording:
             self.stop_video_recording()
+        if self.video_recorder:
+            self.video_recorder.wait()
         
         sys.exit()
 
+class BatchRenderer:
+    """Headless renderer: draws samples into an offscreen surface as fast as possible"""
+    
+    def __init__(self, iris_data: IrisData, width: int = WIDTH - 300, height: int = HEIGHT,
+                 color_scheme: str = 'Ocean Blues', backend: str = 'pygame'):
+        self.iris_data = iris_data
+        self.width = width
+        self.height = height
+        self.surface = pygame.Surface((width, height))
+        self.visualizer = FlowerVisualizer(width, height)
+        schemes = self.visualizer.get_enhanced_color_schemes()
+        if color_scheme not in schemes:
+            raise ValueError(f"Unknown color scheme '{color_scheme}', expected one of {list(schemes)}")
+        self.colors = schemes[color_scheme]
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend '{backend}', expected one of {list(RENDER_BACKENDS)}")
+        self.visualizer.render_backend = backend
+        self.scale_animation_speed = SCALE_ANIMATION_SPEED
+        self.scale_range = SCALE_RANGE
+    
+    def render_frame(self, index: int, t, pixel_scale: float = 1.0) -> pygame.Surface:
+        """Render sample `index` at animation time t (in simulation steps, any value) into the offscreen surface"""
+        self.surface.fill(BG_COLOR)
+        visual_params = self.iris_data.get_visual_params(index)
+        scale_factor = breathing_scale_factor(t, self.scale_animation_speed, self.scale_range)
+        self.visualizer.draw_data_driven_flower(self.surface, self.visualizer.center_x, self.visualizer.center_y,
+                                                visual_params, self.colors, t, None, scale_factor, pixel_scale)
+        return self.surface
+    
+    def sample_name(self, index: int) -> str:
+        """File-system friendly name of a sample, e.g. sample0001_setosa"""
+        sample = self.iris_data.get_sample_by_index(index)
+        return f"sample{sample['id']:04d}_{sample['species'].replace('Iris-', '')}"
+    
+    def render_sample(self, index: int, out_dir: str, frames: int, output_format: str = 'png',
+                      fps: int = 30, thumbnail_size: Optional[Tuple[int, int]] = (200, 178)) -> int:
+        """Render a thumbnail and a `frames`-long loop of one sample; returns the number of frames rendered"""
+        name = self.sample_name(index)
+        # Output frames advance the animation at the app's real-time speed
+        step = SIMULATION_RATE / fps
+        
+        if thumbnail_size:
+            thumbnail_dir = os.path.join(out_dir, "thumbnails")
+            os.makedirs(thumbnail_dir, exist_ok=True)
+            pixel_scale = min(thumbnail_size[0] / self.width, thumbnail_size[1] / self.height)
+            thumbnail = pygame.transform.smoothscale(self.render_frame(index, 0, pixel_scale), thumbnail_size)
+            pygame.image.save(thumbnail, os.path.join(thumbnail_dir, f"{name}.png"))
+        
+        if output_format == 'mp4':
+            recorder = VideoRecorder(os.path.join(out_dir, f"{name}.mp4"), (self.width, self.height), fps,
+                                     backpressure='block')
+            for frame in range(frames):
+                recorder.capture(self.render_frame(index, frame * step))
+            recorder.stop()
+            recorder.wait()
+        else:
+            frame_dir = os.path.join(out_dir, name)
+            os.makedirs(frame_dir, exist_ok=True)
+            for frame in range(frames):
+                pygame.image.save(self.render_frame(index, frame * step), os.path.join(frame_dir, RENDER_FRAME_NAME.format(frame)))
+        return frames
+
+# Per-process renderer used by the batch rendering tasks (one offscreen surface per worker)
+_worker_renderer = None
+
+def init_render_worker(data_path: str, size: Tuple[int, int], color_scheme: str, deterministic: bool,
+                       memory_map: bool = False, backend: str = 'pygame', lod_quality: Optional[float] = 1.0,
+                       iris_data: Optional[IrisData] = None):
+    """Set up the headless renderer of a batch rendering process"""
+    global _worker_renderer
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    if deterministic:
+        # Keep every library on one code path so sharded and serial runs produce identical bytes
+        cv2.setNumThreads(1)
+    iris_data = iris_data or IrisData(data_path, memory_map=memory_map)
+    _worker_renderer = BatchRenderer(iris_data, size[0], size[1], color_scheme, backend)
+    # The level of detail only depends on the flower's size and the fixed quality, never on timing
+    _worker_renderer.visualizer.lod_quality = lod_quality
+
+def render_sample_task(task: Tuple) -> int:
+    """Batch task: render the thumbnail and loop of one sample"""
+    index, out_dir, frames, output_format, fps, thumbnail_size = task
+    return _worker_renderer.render_sample(index, out_dir, frames, output_format, fps, thumbnail_size)
+
+def render_frame_range_task(task: Tuple):
+    """Batch task: render frames [start, stop) of one sample's animation, saved as PNGs in frame_dir or returned as BGR arrays"""
+    index, start, stop, step, frame_dir = task
+    frames = []
+    for frame in range(start, stop):
+        surface = _worker_renderer.render_frame(index, frame * step)
+        if frame_dir:
+            pygame.image.save(surface, os.path.join(frame_dir, RENDER_FRAME_NAME.format(frame)))
+        else:
+            bgr = np.empty((surface.get_height(), surface.get_width(), 3), dtype=np.uint8)
+            copy_surface_bgr(surface, bgr)
+            frames.append(bgr)
+    return stop - start if frame_dir else frames
+
+def imap_bounded(pool: "multiprocessing.pool.Pool", function: Callable, tasks: List, window: int):
+    """Like pool.imap, but with at most `window` tasks submitted whose results are not yet consumed"""
+    pending = deque()
+    for task in tasks:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(function, (task,)))
+    while pending:
+        yield pending.popleft().get()
+
+def make_render_parser() -> argparse.ArgumentParser:
+    """Command line options of the headless `render` command"""
+    parser = argparse.ArgumentParser(prog="main.py render",
+                                     description="Render thumbnails and animation loops for every sample, headless")
+    parser.add_argument("--data", default="Iris data.csv", help="CSV dataset to render")
+    parser.add_argument("--out", default="renders", help="Output directory")
+    parser.add_argument("--format", choices=['png', 'mp4'], default='png', help="PNG sequence or MP4 per sample")
+    parser.add_argument("--frames", type=int, default=60, help="Frames per animation loop")
+    parser.add_argument("--fps", type=int, default=30, help="Output frame rate")
+    parser.add_argument("--size", default=f"{WIDTH - 300}x{HEIGHT}", help="Frame size as WIDTHxHEIGHT")
+    parser.add_argument("--thumbnail", default="200x178", help="Thumbnail size as WIDTHxHEIGHT, or 'none'")
+    parser.add_argument("--species", help="Only render one species, e.g. Iris-setosa")
+    parser.add_argument("--limit", type=int, help="Render at most this many samples")
+    parser.add_argument("--scheme", default='Ocean Blues', help="Color scheme name")
+    parser.add_argument("--workers", type=int, default=1, help="Rendering processes (0 = one per CPU core)")
+    parser.add_argument("--animation", type=int, metavar="INDEX",
+                        help="Render one long animation of the sample at this row index (0-based), sharded by frame range")
+    parser.add_argument("--chunk", type=int, default=16, help="Frames per task when sharding an animation")
+    parser.add_argument("--deterministic", action="store_true",
+                        help="Guarantee byte-identical frames between sharded and serial runs")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map the dataset instead of loading it (for datasets larger than RAM)")
+    parser.add_argument("--backend", choices=RENDER_BACKENDS, default='pygame',
+                        help="Petal drawing: pygame anti-aliased lines or the batched NumPy rasterizer")
+    parser.add_argument("--lod", type=float, default=1.0, metavar="QUALITY",
+                        help="Level-of-detail quality (petal sampling density scale; 0 = always full detail)")
+    return parser
+
+def parse_size(text: str) -> Optional[Tuple[int, int]]:
+    """Parse 'WIDTHxHEIGHT' (or 'none')"""
+    if text.lower() == 'none':
+        return None
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+def run_batch_render(argv: List[str]) -> int:
+    """Entry point of `main.py render`: render the dataset offscreen and report throughput"""
+    parser = make_render_parser()
+    args = parser.parse_args(argv)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    
+    iris_data = IrisData(args.data, memory_map=args.mmap)
+    size = parse_size(args.size)
+    workers = args.workers or os.cpu_count() or 1
+    step = SIMULATION_RATE / args.fps
+    os.makedirs(args.out, exist_ok=True)
+    
+    if args.animation is not None:
+        # One long animation: contiguous frame ranges, reassembled in order by the parent
+        index = args.animation
+        sample = iris_data.get_sample_by_index(index)
+        if sample is None:
+            parser.error(f"--animation: row index {index} is out of range (the dataset has {iris_data.size} rows)")
+        name = f"sample{sample['id']:04d}_animation"
+        frame_dir = os.path.join(args.out, name) if args.format == 'png' else None
+        if frame_dir:
+            os.makedirs(frame_dir, exist_ok=True)
+        tasks = [(index, start, min(start + args.chunk, args.frames), step, frame_dir)
+                 for start in range(0, args.frames, args.chunk)]
+        task_function = render_frame_range_task
+        label = f"animation of sample #{sample['id']} (row {index}, {len(tasks)} chunks)"
+    else:
+        # Whole dataset: one task per sample, each writing its own files
+        if args.species:
+            indices = iris_data.get_species_indices(args.species)[:args.limit].tolist()
+        else:
+            indices = list(range(iris_data.size)[:args.limit])
+        thumbnail_size = parse_size(args.thumbnail)
+        tasks = [(index, args.out, args.frames, args.format, args.fps, thumbnail_size) for index in indices]
+        task_function = render_sample_task
+        label = f"{len(tasks)} samples"
+    
+    recorder = None
+    if task_function is render_frame_range_task and not frame_dir:
+        recorder = VideoRecorder(os.path.join(args.out, f"{name}.mp4"), size, args.fps, backpressure='block')
+    
+    start_time = time.perf_counter()
+    total_frames = 0
+    initargs = (args.data, size, args.scheme, args.deterministic, args.mmap, args.backend, args.lod or None)
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, init_render_worker, initargs)
+        # A finished animation chunk holds --chunk full-size frames until the parent encodes it,
+        # so only a couple of chunks per worker may be in flight
+        results = imap_bounded(pool, task_function, tasks, 2 * workers)
+    else:
+        init_render_worker(*initargs, iris_data=iris_data)
+        results = map(task_function, tasks)
+    
+    try:
+        for count, result in enumerate(results, 1):
+            if recorder:
+                # Results arrive in task order, so the video is assembled in frame order
+                for frame in result:
+                    buffer = recorder.acquire_buffer()
+                    np.copyto(buffer, frame)
+                    recorder.submit(buffer)
+                result = len(result)
+            total_frames += result
+            if count % 10 == 0 or count == len(tasks):
+                elapsed = time.perf_counter() - start_time
+                print(f"[{count}/{len(tasks)}] {total_frames} frames, {total_frames / elapsed:.1f} FPS")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        if recorder:
+            recorder.stop()
+            recorder.wait()
+    
+    elapsed = time.perf_counter() - start_time
+    print(f"Rendered {label}, {total_frames} frames in {elapsed:.1f}s with {workers} worker(s): "
+          f"{total_frames / max(elapsed, 1e-9):.1f} FPS")
+    pygame.quit()
+    return 0
+
 def main():
     """Main function"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'render':
+        sys.exit(run_batch_render(sys.argv[2:]))
+    
+    parser = argparse.ArgumentParser(description="Interactive Iris flower visualization "
+                                                 "(use `main.py render --help` for headless rendering)")
+    parser.add_argument("--data", default="Iris data.csv", help="CSV dataset to visualize")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map the dataset instead of loading it (for datasets larger than RAM)")
+    parser.add_argument("--frame-cache", type=int, default=0, metavar="MB",
+                        help="Loop the idle animation and replay it from a frame cache of this many MB (0: off)")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help="Render rate cap; the animation runs in real time at any rate")
+    parser.add_argument("--profile-log", metavar="PATH",
+                        help="Write per-frame stage timings and counters to a .csv or .jsonl file")
+    args = parser.parse_args()
+    
     try:
-        app = InteractiveFlowerApp()
+        app = InteractiveFlowerApp(args.data, memory_map=args.mmap, frame_cache_mb=args.frame_cache,
+                                   profile_log=args.profile_log, render_fps=args.fps)
         app.run()
     except Exception as e:
         import traceback